@@ -8,11 +8,10 @@ from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.config import settings
+from app.config import get_settings
 from api.middleware.telegram_auth import TelegramAuthMiddleware, get_current_user_id
-from api.models.base import engine, Base
+from api.models.base import get_engine, Base
 from api.routers import habits, ai, user
-from api.services.ai_service import AIService
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,12 +35,11 @@ app.add_middleware(
 # Telegram Auth Middleware
 app.add_middleware(
     TelegramAuthMiddleware,
-    bot_token=settings.bot_token
+    bot_token=get_settings().bot_token
 )
 
-# Dependency для AI сервиса
-async def get_ai_service():
-    return AIService()
+# Dependency для AI сервиса (общий экземпляр из роутера)
+get_ai_service = ai.get_ai_service
 
 
 @app.on_event("startup")
@@ -49,7 +47,7 @@ async def startup():
     """Инициализация при старте."""
     logger.info("Starting HabitMax Mini App API...")
     # Создаем таблицы для новых моделей
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created")
 
@@ -58,6 +56,7 @@ async def startup():
 async def shutdown():
     """Очистка при остановке."""
     logger.info("Shutting down...")
+    await get_ai_service().close()
 
 
 @app.get("/health")
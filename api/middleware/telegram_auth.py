@@ -14,7 +14,6 @@ from fastapi import HTTPException, Request
 from fastapi.security import HTTPBearer
 from starlette.middleware.base import BaseHTTPMiddleware
 
-from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -4,13 +4,14 @@
 """
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Integer, String, Text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Integer, String, Text, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from app.config import settings
+from app.config import get_settings
 
 
 class Base(DeclarativeBase):
@@ -27,7 +28,7 @@ class UserActivity(Base):
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"))
     
     # Данные о сессии
-    session_start: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    session_start: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now())
     session_end: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     
     # Действия в Mini App
@@ -58,7 +59,7 @@ class WeeklySummary(Base):
     
     # AI-генерация
     ai_summary_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    generated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    generated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now())
     
     # Кэширование
     is_cached: Mapped[bool] = mapped_column(default=True)
@@ -81,7 +82,7 @@ class FailureAnalysis(Base):
     # AI-генерация
     ai_analysis: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     strategies: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON
-    generated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    generated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now())
     
     # Кэширование
     is_cached: Mapped[bool] = mapped_column(default=True)
@@ -106,7 +107,7 @@ class AIRequestCache(Base):
     response_data: Mapped[str] = mapped_column(Text)
     
     # TTL
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now())
     expires_at: Mapped[datetime] = mapped_column(DateTime)
 
 
@@ -128,26 +129,37 @@ class HabitInsight(Base):
     
     # Метаданные
     confidence_score: Mapped[float] = mapped_column(Float, default=0.0)  # 0-1
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, server_default=func.now())
     is_read: Mapped[bool] = mapped_column(default=False)
 
 
-# Database engine и session
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.log_level == "DEBUG"
-)
+# Database engine и session создаются при первом обращении, а не при импорте
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """Engine БД для Mini App API."""
+    settings = get_settings()
+    return create_async_engine(
+        settings.database_url,
+        echo=settings.log_level == "DEBUG",
+        query_cache_size=1200,
+        pool_pre_ping=True,
+        **settings.engine_pool_options
+    )
 
-SessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+
+@lru_cache(maxsize=1)
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий поверх общего engine."""
+    return async_sessionmaker(
+        get_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
 
 
 async def get_db() -> AsyncSession:
     """Dependency для получения сессии БД."""
-    async with SessionLocal() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
         finally:
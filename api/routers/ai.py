@@ -2,7 +2,9 @@
 Роутер для AI-функций.
 """
 
+from collections import Counter
 from datetime import date, timedelta
+from functools import lru_cache
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -27,7 +29,9 @@ from app.models import Habit, HabitLog
 router = APIRouter()
 
 
-def get_ai_service():
+@lru_cache(maxsize=1)
+def get_ai_service() -> AIService:
+    """Общий AIService на процесс (вместе с его пулом HTTP-соединений)."""
     return AIService()
 
 
@@ -157,14 +161,12 @@ async def analyze_failures(
         )
     
     # Анализируем паттерны
-    patterns = {}
+    patterns = Counter()
     reasons = []
     
     for log in logs:
         # День недели
-        weekday = log.completed_date.strftime("%A")
-        key = weekday
-        patterns[key] = patterns.get(key, 0) + 1
+        patterns[log.completed_date.strftime("%A")] += 1
         
         # Причины
         if log.notes:
@@ -178,7 +180,7 @@ async def analyze_failures(
             reason=None,
             frequency=count
         )
-        for day, count in sorted(patterns.items(), key=lambda x: -x[1])[:3]
+        for day, count in patterns.most_common(3)
     ]
     
     # Анализ через AI
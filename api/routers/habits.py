@@ -2,12 +2,13 @@
 Роутер для работы с привычками.
 """
 
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, case, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
 from api.middleware.telegram_auth import get_current_user_id
 from api.models.base import get_db
@@ -33,9 +34,9 @@ async def get_habits(
 ):
     """Получить список привычек пользователя."""
     result = await db.execute(
-        select(Habit).where(
-            and_(Habit.user_id == user_id, Habit.is_active == True)
-        )
+        select(Habit)
+        .where(and_(Habit.user_id == user_id, Habit.is_active == True))
+        .options(undefer(Habit.description))
     )
     habits = result.scalars().all()
     
@@ -77,8 +78,9 @@ async def create_habit(
     )
     
     db.add(new_habit)
+    # Без refresh(): он снова отложил бы description, а все поля ответа
+    # уже есть в объекте (expire_on_commit=False)
     await db.commit()
-    await db.refresh(new_habit)
     
     return HabitResponse.model_validate(new_habit)
 
@@ -91,9 +93,9 @@ async def get_habit(
 ):
     """Получить конкретную привычку."""
     result = await db.execute(
-        select(Habit).where(
-            and_(Habit.id == habit_id, Habit.user_id == user_id)
-        )
+        select(Habit)
+        .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
+        .options(undefer(Habit.description))
     )
     habit = result.scalar_one_or_none()
     
@@ -112,9 +114,9 @@ async def update_habit(
 ):
     """Обновить привычку."""
     result = await db.execute(
-        select(Habit).where(
-            and_(Habit.id == habit_id, Habit.user_id == user_id)
-        )
+        select(Habit)
+        .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
+        .options(undefer(Habit.description))
     )
     habit = result.scalar_one_or_none()
     
@@ -134,7 +136,6 @@ async def update_habit(
         setattr(habit, field, value)
     
     await db.commit()
-    await db.refresh(habit)
     
     return HabitResponse.model_validate(habit)
 
@@ -170,43 +171,49 @@ async def complete_habit(
     db: AsyncSession = Depends(get_db)
 ):
     """Отметить привычку выполненной."""
+    today = date.today()
+    
+    # Счетчики обновляются одним UPDATE без загрузки привычки в ORM
     result = await db.execute(
-        select(Habit).where(
-            and_(Habit.id == habit_id, Habit.user_id == user_id)
+        update(Habit)
+        .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
+        .values(
+            total_completions=Habit.total_completions + 1,
+            current_streak=Habit.current_streak + 1,
+            best_streak=case(
+                (Habit.current_streak + 1 > Habit.best_streak, Habit.current_streak + 1),
+                else_=Habit.best_streak
+            ),
+            last_completed_date=today
         )
+        .returning(Habit.current_streak)
+        .execution_options(synchronize_session=False)
     )
-    habit = result.scalar_one_or_none()
+    current_streak = result.scalar_one_or_none()
     
-    if not habit:
+    if current_streak is None:
         raise HTTPException(status_code=404, detail="Привычка не найдена")
     
     # Создаем лог
-    log = HabitLog(
-        habit_id=habit_id,
-        user_id=user_id,
-        completed_date=date.today(),
-        status="completed",
-        notes=data.notes if data else None,
-        mood=data.mood if data else None,
-        completed_at=datetime.utcnow()
+    await db.execute(
+        insert(HabitLog).values(
+            habit_id=habit_id,
+            user_id=user_id,
+            completed_date=today,
+            status="completed",
+            notes=data.notes if data else None,
+            mood=data.mood if data else None
+        )
     )
-    
-    # Обновляем привычку
-    habit.total_completions += 1
-    habit.current_streak += 1
-    if habit.current_streak > habit.best_streak:
-        habit.best_streak = habit.current_streak
-    
-    db.add(log)
     await db.commit()
     
     # Проверяем milestones
-    is_milestone = habit.current_streak in [7, 21, 30, 60, 100]
+    is_milestone = current_streak in [7, 21, 30, 60, 100]
     
     return HabitCompleteResponse(
         success=True,
-        new_streak=habit.current_streak,
-        message=f"Отлично! 🔥 Серия: {habit.current_streak} дней",
+        new_streak=current_streak,
+        message=f"Отлично! 🔥 Серия: {current_streak} дней",
         is_milestone=is_milestone
     )
 
@@ -219,30 +226,36 @@ async def skip_habit(
     db: AsyncSession = Depends(get_db)
 ):
     """Отметить пропуск привычки с причиной."""
+    today = date.today()
+    
+    # Сбрасываем серию одним UPDATE
     result = await db.execute(
-        select(Habit).where(
-            and_(Habit.id == habit_id, Habit.user_id == user_id)
+        update(Habit)
+        .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
+        .values(
+            current_streak=0,
+            last_completed_date=case(
+                (Habit.last_completed_date == today, None),
+                else_=Habit.last_completed_date
+            )
         )
+        .returning(Habit.id)
+        .execution_options(synchronize_session=False)
     )
-    habit = result.scalar_one_or_none()
     
-    if not habit:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Привычка не найдена")
     
     # Создаем лог
-    log = HabitLog(
-        habit_id=habit_id,
-        user_id=user_id,
-        completed_date=date.today(),
-        status="skipped",
-        notes=reason,
-        completed_at=datetime.utcnow()
+    await db.execute(
+        insert(HabitLog).values(
+            habit_id=habit_id,
+            user_id=user_id,
+            completed_date=today,
+            status="skipped",
+            notes=reason
+        )
     )
-    
-    # Сбрасываем серию
-    habit.current_streak = 0
-    
-    db.add(log)
     await db.commit()
     
     return {"success": True, "message": "Записано. Не сдавайся! 💪"}
@@ -7,6 +7,8 @@ from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from app.models.habit import HabitFrequency
+
 
 class HabitBase(BaseModel):
     """Базовая схема привычки."""
@@ -14,7 +16,7 @@ class HabitBase(BaseModel):
     description: Optional[str] = Field(None, max_length=500)
     emoji: str = Field(default="✅", max_length=10)
     reminder_time: Optional[time] = None
-    frequency: str = Field(default="daily")
+    frequency: HabitFrequency = Field(default=HabitFrequency.DAILY)
     target_days: int = Field(default=21, ge=1, le=365)
 
 
@@ -29,7 +31,7 @@ class HabitUpdate(BaseModel):
     description: Optional[str] = None
     emoji: Optional[str] = None
     reminder_time: Optional[time] = None
-    frequency: Optional[str] = None
+    frequency: Optional[HabitFrequency] = None
     is_active: Optional[bool] = None
 
 
@@ -13,7 +13,7 @@ import aiohttp
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, delete
 
-from app.config import settings
+from app.config import get_settings
 from api.models.base import AIRequestCache
 from api.schemas.ai import (
     AIAdviceResponse,
@@ -32,6 +32,7 @@ class AIService:
     """Сервис для AI-запросов с кэшированием."""
     
     def __init__(self):
+        settings = get_settings()
         self.api_key = settings.openrouter_api_key
         self.base_url = settings.openrouter_base_url
         self.model = settings.openrouter_model
@@ -39,6 +40,10 @@ class AIService:
         self.max_tokens = 500
         self.cache_ttl_hours = 1
         
+        # Одна HTTP-сессия на процесс: TLS-соединения с OpenRouter
+        # переиспользуются между запросами (создаётся при первом запросе)
+        self._session: Optional[aiohttp.ClientSession] = None
+        
         # Fallback шаблоны
         self.fallback_summaries = [
             "📊 Отличная неделя! Ты на верном пути к формированию устойчивых привычек. Продолжай в том же духе!",
@@ -135,6 +140,28 @@ class AIService:
         session.add(cache)
         await session.commit()
     
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Получение HTTP-сессии (создаётся один раз и переиспользуется)."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=aiohttp.ClientTimeout(total=30, connect=10)
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        """Закрытие HTTP-сессии (вместе с пулом соединений)."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+    
     async def _make_request(
         self,
         messages: List[dict],
@@ -157,24 +184,23 @@ class AIService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data["choices"][0]["message"]["content"]
-                    elif response.status == 429:
-                        logger.warning("Rate limit exceeded")
-                        return None
-                    else:
-                        text = await response.text()
-                        logger.error(f"OpenRouter error: {response.status} - {text}")
-                        return None
-                        
+            session = await self._get_session()
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload
+            ) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data["choices"][0]["message"]["content"]
+                elif response.status == 429:
+                    logger.warning("Rate limit exceeded")
+                    return None
+                else:
+                    text = await response.text()
+                    logger.error(f"OpenRouter error: {response.status} - {text}")
+                    return None
+                    
         except Exception as e:
             logger.error(f"Error making AI request: {e}")
             return None
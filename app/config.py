@@ -3,7 +3,8 @@
 Все чувствительные данные загружаются из переменных окружения.
 """
 
-from typing import List, Optional
+from functools import lru_cache
+from typing import FrozenSet, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
 
@@ -43,13 +44,23 @@ class Settings(BaseSettings):
         default="sqlite+aiosqlite:///./habitmax.db",
         description="URL базы данных (SQLite или PostgreSQL)"
     )
+    db_pool_size: int = Field(default=20, description="Размер пула соединений (PostgreSQL)")
+    db_max_overflow: int = Field(default=30, description="Соединений сверх пула (PostgreSQL)")
+    db_pool_recycle: int = Field(
+        default=1800,
+        description="Пересоздавать соединения старше N секунд (PostgreSQL)"
+    )
+    
+    # Redis (опционально): общие rate limit и FSM для нескольких процессов бота
+    redis_url: Optional[str] = Field(default=None, description="URL Redis")
     
     # Logging
     log_level: str = Field(default="INFO", description="Уровень логирования")
     
     # Admin
-    admin_ids: List[int] = Field(
-        default_factory=list,
+    # frozenset: проверка "user_id in admin_ids" на каждой команде - O(1)
+    admin_ids: FrozenSet[int] = Field(
+        default_factory=frozenset,
         description="Список ID администраторов"
     )
     
@@ -64,18 +75,35 @@ class Settings(BaseSettings):
     def parse_admin_ids(cls, v):
         """Парсинг списка ID администраторов из строки."""
         if isinstance(v, int):
-            return [v]
+            return frozenset((v,))
         if isinstance(v, str):
             if not v.strip():
-                return []
-            return [int(x.strip()) for x in v.split(",") if x.strip()]
-        return v or []
+                return frozenset()
+            return frozenset(int(x.strip()) for x in v.split(",") if x.strip())
+        return frozenset(v or ())
     
     @property
     def is_postgres(self) -> bool:
         """Проверка, используется ли PostgreSQL."""
         return "postgresql" in self.database_url.lower()
     
+    @property
+    def engine_pool_options(self) -> dict:
+        """
+        Параметры пула для create_async_engine.
+        
+        Только для PostgreSQL: SQLite in-memory работает на StaticPool,
+        который не принимает эти аргументы.
+        """
+        if not self.is_postgres:
+            return {}
+        return {
+            "pool_size": self.db_pool_size,
+            "max_overflow": self.db_max_overflow,
+            "pool_recycle": self.db_pool_recycle,
+            "pool_use_lifo": True,
+        }
+    
     @property
     def webhook_url(self) -> Optional[str]:
         """Полный URL webhook."""
@@ -84,5 +112,7 @@ class Settings(BaseSettings):
         return None
 
 
-# Глобальный экземпляр настроек
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Настройки приложения (окружение и .env читаются при первом обращении)."""
+    return Settings()
@@ -2,6 +2,7 @@
 Админ-команды для управления ботом.
 """
 
+import asyncio
 import logging
 from datetime import date, datetime, timedelta
 from typing import List
@@ -12,7 +13,6 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from app.config import settings
 from app.services.database import DatabaseService
 from app.utils.decorators import admin_required
 from app.keyboards.reply_keyboards import (
@@ -24,6 +24,9 @@ from app.keyboards.reply_keyboards import (
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Сколько сообщений рассылки отправлять за секунду
+BROADCAST_BATCH_SIZE = 25
+
 
 # ==================== Admin Commands ====================
 
@@ -217,7 +220,7 @@ async def callback_broadcast_confirm(
         f"📤 Рассылка: 0/{len(user_ids)} отправлено..."
     )
     
-    for i, user_id in enumerate(user_ids):
+    async def send(user_id: int) -> bool:
         try:
             await bot.send_message(
                 chat_id=user_id,
@@ -225,21 +228,31 @@ async def callback_broadcast_confirm(
                 parse_mode="HTML",
                 disable_web_page_preview=True
             )
-            sent += 1
+            return True
         except Exception as e:
-            failed += 1
             logger.warning(f"Failed to send broadcast to {user_id}: {e}")
+            return False
+    
+    # Пачка отправляется параллельно, но не быстрее BROADCAST_BATCH_SIZE
+    # сообщений в секунду (общий лимит Telegram ~30 msg/s)
+    for start in range(0, len(user_ids), BROADCAST_BATCH_SIZE):
+        batch = user_ids[start:start + BROADCAST_BATCH_SIZE]
+        *results, _ = await asyncio.gather(
+            *(send(user_id) for user_id in batch),
+            asyncio.sleep(1)
+        )
+        sent += sum(results)
+        failed += len(results) - sum(results)
         
-        # Обновляем статус каждые 10 сообщений
-        if (i + 1) % 10 == 0:
-            try:
-                await status_msg.edit_text(
-                    f"📤 Рассылка: {i+1}/{len(user_ids)} отправлено...\n"
-                    f"✅ Успешно: {sent}\n"
-                    f"❌ Ошибок: {failed}"
-                )
-            except:
-                pass
+        # Обновляем статус после каждой пачки
+        try:
+            await status_msg.edit_text(
+                f"📤 Рассылка: {start + len(batch)}/{len(user_ids)} отправлено...\n"
+                f"✅ Успешно: {sent}\n"
+                f"❌ Ошибок: {failed}"
+            )
+        except:
+            pass
     
     await state.clear()
     
@@ -9,9 +9,10 @@ from aiogram import Router, F, types
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from app.config import get_settings
 from app.services.database import DatabaseService
 from app.services.ai_service import AIService
-from app.services.rate_limiter import ai_rate_limiter
+from app.services.rate_limiter import get_ai_rate_limiter
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -21,7 +22,7 @@ router = Router()
 async def cmd_ai_advice(message: types.Message, db: DatabaseService, ai: AIService) -> None:
     """Получить AI-рекомендацию."""
     # Проверяем rate limit
-    allowed, reason = ai_rate_limiter.check_rate_limit(message.from_user.id)
+    allowed, reason = await get_ai_rate_limiter().check_rate_limit(message.from_user.id)
     if not allowed:
         await message.answer(f"❌ {reason}")
         return
@@ -37,11 +38,14 @@ async def cmd_ai_advice(message: types.Message, db: DatabaseService, ai: AIServi
             last_name=message.from_user.last_name
         )
         
-        # Получаем рекомендацию
-        recommendation = await ai.get_habit_recommendation(user)
+        # Получаем рекомендацию (текст появляется в сообщении по мере генерации)
+        async def show_partial(text: str) -> None:
+            await thinking_msg.edit_text(f"🤖 {text}…")
+        
+        recommendation = await ai.get_habit_recommendation(user, on_partial=show_partial)
         
         # Записываем успешный запрос в rate limiter
-        ai_rate_limiter.record_request(message.from_user.id)
+        await get_ai_rate_limiter().record_request(message.from_user.id)
         
         # Удаляем сообщение о загрузке
         await thinking_msg.delete()
@@ -96,7 +100,7 @@ async def callback_ai_advice(
 ) -> None:
     """AI-совет через callback."""
     # Проверяем rate limit
-    allowed, reason = ai_rate_limiter.check_rate_limit(callback.from_user.id)
+    allowed, reason = await get_ai_rate_limiter().check_rate_limit(callback.from_user.id)
     if not allowed:
         await callback.answer(f"❌ {reason}", show_alert=True)
         return
@@ -115,7 +119,7 @@ async def callback_ai_advice(
         recommendation = await ai.get_habit_recommendation(user)
         
         # Записываем успешный запрос
-        ai_rate_limiter.record_request(callback.from_user.id)
+        await get_ai_rate_limiter().record_request(callback.from_user.id)
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [
@@ -161,7 +165,7 @@ async def cmd_analyze_patterns(
 ) -> None:
     """Анализ паттернов пользователя."""
     # Проверяем rate limit
-    allowed, reason = ai_rate_limiter.check_rate_limit(message.from_user.id)
+    allowed, reason = await get_ai_rate_limiter().check_rate_limit(message.from_user.id)
     if not allowed:
         await message.answer(f"❌ {reason}")
         return
@@ -178,7 +182,7 @@ async def cmd_analyze_patterns(
         await analyzing_msg.delete()
         
         # Записываем успешный запрос
-        ai_rate_limiter.record_request(message.from_user.id)
+        await get_ai_rate_limiter().record_request(message.from_user.id)
         
         if not patterns:
             await message.answer(
@@ -302,7 +306,7 @@ async def cmd_ai_status(message: types.Message, ai: AIService) -> None:
         {"role": "user", "content": "Say 'OK' only."}
     ]
     
-    from app.config import settings
+    settings = get_settings()
     
     status_text = (
         f"🤖 <b>Статус AI-сервиса:</b>\n\n"
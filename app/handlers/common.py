@@ -11,6 +11,7 @@ from aiogram.filters import Command, CommandStart
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from app.services.database import DatabaseService
+from app.keyboards import get_broken_streaks_keyboard
 from app.keyboards.reply_keyboards import get_main_menu_keyboard
 from app.services.streak_service import StreakService
 from app.models import Habit
@@ -37,26 +38,18 @@ async def notify_broken_streaks(
             f"Не расстраивайся! Начни новую серию прямо сейчас 💪"
         )
     else:
+        lines = "".join(
+            f"• {habit.emoji} {habit.name}: {old_streak} дней\n"
+            for habit, old_streak in broken
+        )
         text = (
             f"😔 <b>Несколько серий прервано</b>\n\n"
             f"Сброшены серии:\n"
+            f"{lines}"
+            f"\nНе сдавайся! Начни заново 💪"
         )
-        for habit, old_streak in broken:
-            text += f"• {habit.emoji} {habit.name}: {old_streak} дней\n"
-        text += "\nНе сдавайся! Начни заново 💪"
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(
-                text="📋 Мои привычки",
-                callback_data="list_habits"
-            ),
-            InlineKeyboardButton(
-                text="🤖 AI-совет",
-                callback_data="ai_advice"
-            )
-        ]
-    ])
+    keyboard = get_broken_streaks_keyboard()
     
     await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
 
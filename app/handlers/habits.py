@@ -131,8 +131,9 @@ async def cmd_my_habits(message: types.Message, db: DatabaseService) -> None:
 @router.message(Command("my_progress"))
 async def cmd_my_progress(message: types.Message, db: DatabaseService) -> None:
     """Показать статистику прогресса."""
-    stats = await db.get_user_stats(message.from_user.id)
-    user = await db.get_user(message.from_user.id)
+    async with db.session_factory() as session:
+        stats = await db.get_user_stats(message.from_user.id, session=session)
+        user = await db.get_user(message.from_user.id, session=session)
     
     text = (
         f"📊 <b>Твой прогресс</b>\n\n"
@@ -827,8 +828,9 @@ async def callback_list_habits(callback: types.CallbackQuery, db: DatabaseServic
 async def callback_show_progress(callback: types.CallbackQuery, db: DatabaseService) -> None:
     """Показать прогресс через callback."""
     await callback.answer()
-    stats = await db.get_user_stats(callback.from_user.id)
-    user = await db.get_user(callback.from_user.id)
+    async with db.session_factory() as session:
+        stats = await db.get_user_stats(callback.from_user.id, session=session)
+        user = await db.get_user(callback.from_user.id, session=session)
     
     if not user:
         await callback.answer("Ошибка! Сначала запустите /start", show_alert=True)
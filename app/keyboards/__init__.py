@@ -9,6 +9,11 @@ from .fsm_keyboards import (
     get_confirmation_keyboard,
     get_invalid_input_keyboard,
 )
+from .inline_keyboards import (
+    get_reminder_keyboard,
+    get_manual_reminder_keyboard,
+    get_broken_streaks_keyboard,
+)
 from .reply_keyboards import (
     get_main_menu_keyboard,
     get_cancel_keyboard,
@@ -25,6 +30,9 @@ __all__ = [
     "get_time_selection_keyboard",
     "get_confirmation_keyboard",
     "get_invalid_input_keyboard",
+    "get_reminder_keyboard",
+    "get_manual_reminder_keyboard",
+    "get_broken_streaks_keyboard",
     "get_main_menu_keyboard",
     "get_cancel_keyboard",
     "get_confirm_cancel_keyboard",
@@ -7,6 +7,21 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 
+# Варианты выбора для шагов создания привычки
+_EMOJIS = (
+    "✅", "💪", "🏃", "📚",
+    "💧", "🧘", "🥗", "💊",
+    "🎯", "⭐", "🔥", "❤️",
+)
+
+_FREQUENCIES = (
+    ("📅 Каждый день", "daily"),
+    ("📆 По будням", "weekdays"),
+    ("🎉 По выходным", "weekends"),
+    ("🗓 Раз в неделю", "weekly"),
+)
+
+
 def get_fsm_navigation_keyboard(
     show_back: bool = True,
     back_callback: str = "fsm:back",
@@ -59,26 +74,20 @@ def get_emoji_selection_keyboard(
         back_callback: Callback для кнопки Назад
         cancel_callback: Callback для кнопки Отмена
     """
-    emojis = [
-        "✅", "💪", "🏃", "📚",
-        "💧", "🧘", "🥗", "💊",
-        "🎯", "⭐", "🔥", "❤️"
-    ]
-    
     builder = InlineKeyboardBuilder()
     
-    # Кнопки эмодзи (3 в ряд)
-    for emoji in emojis:
+    # Кнопки эмодзи (4 в ряд)
+    for emoji in _EMOJIS:
         # Подсвечиваем выбранный эмодзи
         text = f"✓ {emoji}" if emoji == selected_emoji else emoji
         builder.button(text=text, callback_data=f"emoji:{emoji}")
     
-    builder.adjust(4)
-    
     # Кнопки навигации
     builder.button(text="◀️ Назад", callback_data=back_callback)
     builder.button(text="❌ Отмена", callback_data=cancel_callback)
-    builder.adjust(2)
+    
+    # Раскладка за один проход: эмодзи по 4, навигация в одну строку
+    builder.adjust(4, 4, 4, 2)
     
     return builder.as_markup()
 
@@ -96,26 +105,19 @@ def get_frequency_selection_keyboard(
         back_callback: Callback для кнопки Назад
         cancel_callback: Callback для кнопки Отмена
     """
-    frequencies = [
-        ("📅 Каждый день", "daily"),
-        ("📆 По будням", "weekdays"),
-        ("🎉 По выходным", "weekends"),
-        ("🗓 Раз в неделю", "weekly"),
-    ]
-    
     builder = InlineKeyboardBuilder()
     
-    for text, value in frequencies:
+    for text, value in _FREQUENCIES:
         # Подсвечиваем выбранную частоту
         btn_text = f"✓ {text}" if value == selected_frequency else text
         builder.button(text=btn_text, callback_data=f"freq:{value}")
     
-    builder.adjust(1)  # По одной кнопке в строке
-    
     # Кнопки навигации
     builder.button(text="◀️ Назад", callback_data=back_callback)
     builder.button(text="❌ Отмена", callback_data=cancel_callback)
-    builder.adjust(2)
+    
+    # По одной частоте в строке, навигация в одну строку
+    builder.adjust(1, 1, 1, 1, 2)
     
     return builder.as_markup()
 
@@ -134,14 +136,10 @@ def get_time_selection_keyboard(
     builder.button(text="🌇 Вечер (20:00)", callback_data="time:20:00")
     builder.button(text="🕐 День (13:00)", callback_data="time:13:00")
     builder.button(text="🌙 Ночь (22:00)", callback_data="time:22:00")
-    builder.adjust(2)
-    
     builder.button(text="🚫 Без напоминания", callback_data="time:none")
-    builder.adjust(1)
-    
     builder.button(text="◀️ Назад", callback_data=back_callback)
     builder.button(text="❌ Отмена", callback_data=cancel_callback)
-    builder.adjust(2)
+    builder.adjust(2, 2, 1, 2)
     
     return builder.as_markup()
 
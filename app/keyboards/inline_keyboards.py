@@ -0,0 +1,63 @@
+"""
+Inline-клавиатуры уведомлений (напоминания, сброс серий).
+
+Клавиатуры зависят только от habit_id, поэтому собираются один раз
+и кэшируются. Возвращаемые объекты общие - изменять их нельзя.
+"""
+
+from functools import lru_cache
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+
+@lru_cache(maxsize=4096)
+def get_reminder_keyboard(habit_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура напоминания: выполнено / отложить / пропустить."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="✅ Выполнено",
+                callback_data=f"complete:{habit_id}"
+            ),
+            InlineKeyboardButton(
+                text="⏰ Напомнить через час",
+                callback_data=f"snooze:{habit_id}"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="❌ Пропустить",
+                callback_data=f"skip:{habit_id}"
+            )
+        ]
+    ])
+
+
+@lru_cache(maxsize=4096)
+def get_manual_reminder_keyboard(habit_id: int) -> InlineKeyboardMarkup:
+    """Клавиатура ручного напоминания (только отметка о выполнении)."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="✅ Выполнено",
+                callback_data=f"complete:{habit_id}"
+            )
+        ]
+    ])
+
+
+@lru_cache(maxsize=1)
+def get_broken_streaks_keyboard() -> InlineKeyboardMarkup:
+    """Клавиатура уведомления о сброшенных сериях."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="📋 Мои привычки",
+                callback_data="list_habits"
+            ),
+            InlineKeyboardButton(
+                text="🤖 AI-совет",
+                callback_data="ai_advice"
+            )
+        ]
+    ])
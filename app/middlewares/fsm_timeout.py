@@ -4,11 +4,12 @@ Middleware для управления таймаутом FSM состояний
 """
 
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery, TelegramObject
+from aiogram.types import TelegramObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.base import StorageKey
 
@@ -23,14 +24,17 @@ class FSMTimeoutMiddleware(BaseMiddleware):
     если пользователь неактивен дольше указанного времени.
     """
     
+    # Минимальный интервал между записями _last_activity (секунды)
+    ACTIVITY_WRITE_INTERVAL = 30
+    
     def __init__(self, timeout_minutes: int = 10):
         """
         Args:
             timeout_minutes: Время бездействия в минутах для сброса FSM
         """
         super().__init__()
-        self.timeout = timedelta(minutes=timeout_minutes)
         self.timeout_minutes = timeout_minutes
+        self._timeout_seconds = timeout_minutes * 60
         logger.info(f"FSMTimeoutMiddleware initialized with timeout={timeout_minutes}min")
     
     async def __call__(
@@ -55,10 +59,10 @@ class FSMTimeoutMiddleware(BaseMiddleware):
                 
                 # Обновляем data после сброса
                 data["state"] = fsm_context
-        
-        # Обновляем время последней активности
-        if fsm_context:
-            await self._update_last_activity(fsm_context)
+            elif state_data is not None and self._activity_is_stale(state_data):
+                # Пишем время активности только внутри сценария и не чаще
+                # раза в ACTIVITY_WRITE_INTERVAL секунд
+                await self._update_last_activity(fsm_context)
         
         return await handler(event, data)
     
@@ -68,31 +72,23 @@ class FSMTimeoutMiddleware(BaseMiddleware):
         
         Returns:
             Tuple[expired: bool, state_data: dict]
+            state_data равен None, если пользователь не находится в сценарии
         """
         try:
-            state_data = await fsm_context.get_data()
-            
-            if not state_data:
-                return False, None
-            
-            # Проверяем, есть ли состояние
+            # Без состояния данные не нужны - экономим чтение из хранилища
             current_state = await fsm_context.get_state()
             if not current_state:
                 return False, None
             
-            # Получаем время последней активности
-            last_activity = state_data.get("_last_activity")
+            state_data = await fsm_context.get_data()
+            last_activity = self._get_last_activity(state_data)
             
-            if not last_activity:
+            if last_activity is None:
                 # Нет записи о времени - считаем, что только начали
                 return False, state_data
             
-            # Парсим время (может быть строкой из JSON)
-            if isinstance(last_activity, str):
-                last_activity = datetime.fromisoformat(last_activity)
-            
             # Проверяем таймаут
-            if datetime.utcnow() - last_activity > self.timeout:
+            if time.time() - last_activity > self._timeout_seconds:
                 return True, state_data
             
             return False, state_data
@@ -101,6 +97,29 @@ class FSMTimeoutMiddleware(BaseMiddleware):
             logger.error(f"Error checking FSM timeout: {e}")
             return False, None
     
+    @staticmethod
+    def _get_last_activity(state_data: Dict) -> Optional[float]:
+        """Время последней активности в epoch-секундах."""
+        last_activity = state_data.get("_last_activity")
+        
+        if not last_activity:
+            return None
+        
+        # Старый формат: ISO-строка или datetime вместо epoch-секунд
+        if isinstance(last_activity, str):
+            last_activity = datetime.fromisoformat(last_activity)
+        if isinstance(last_activity, datetime):
+            last_activity = (last_activity - datetime(1970, 1, 1)).total_seconds()
+        
+        return last_activity
+    
+    def _activity_is_stale(self, state_data: Dict) -> bool:
+        """Нужно ли обновлять время последней активности."""
+        last_activity = self._get_last_activity(state_data)
+        if last_activity is None:
+            return True
+        return time.time() - last_activity >= self.ACTIVITY_WRITE_INTERVAL
+    
     async def _handle_timeout(
         self,
         event: TelegramObject,
@@ -119,18 +138,20 @@ class FSMTimeoutMiddleware(BaseMiddleware):
         )
         
         try:
-            if isinstance(event, Message):
-                await event.answer(timeout_msg, parse_mode="HTML")
-            elif isinstance(event, CallbackQuery):
-                await event.message.edit_text(timeout_msg, parse_mode="HTML")
+            # У CallbackQuery есть исходное сообщение, у Message - нет
+            callback_message = getattr(event, "message", None)
+            if callback_message is not None:
+                await callback_message.edit_text(timeout_msg, parse_mode="HTML")
                 await event.answer("Сессия завершена", show_alert=True)
+            else:
+                await event.answer(timeout_msg, parse_mode="HTML")
         except Exception as e:
             logger.error(f"Failed to send timeout notification: {e}")
     
     async def _update_last_activity(self, fsm_context: FSMContext) -> None:
         """Обновление времени последней активности в FSM."""
         try:
-            await fsm_context.update_data(_last_activity=datetime.utcnow())
+            await fsm_context.update_data(_last_activity=int(time.time()))
         except Exception as e:
             logger.error(f"Error updating FSM last activity: {e}")
 
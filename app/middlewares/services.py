@@ -4,15 +4,18 @@ Middleware для внедрения зависимостей (Dependency Inject
 """
 
 import logging
-from typing import Callable, Dict, Any, Awaitable
+from typing import TYPE_CHECKING, Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, Message, CallbackQuery
+from aiogram.types import TelegramObject
 
-from app.services.database import DatabaseService
-from app.services.ai_service import AIService
-from app.services.reminder_service import ReminderService
-from app.services.streak_service import StreakService
+from app.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from app.services.database import DatabaseService
+    from app.services.ai_service import AIService
+    from app.services.reminder_service import ReminderService
+    from app.services.streak_service import StreakService
 
 logger = logging.getLogger(__name__)
 
@@ -23,17 +26,28 @@ class ServicesMiddleware(BaseMiddleware):
     Реализует Dependency Injection pattern.
     """
     
+    # Streaks проверяются не чаще раза в час: пока пользователь в этом
+    # кэше, запрос к БД на каждое сообщение не нужен
+    STREAK_CHECK_INTERVAL = 3600
+    STREAK_CHECK_CACHE_SIZE = 10_000
+    
     def __init__(
         self,
-        db: DatabaseService,
-        ai: AIService,
-        reminder: ReminderService
+        db: "DatabaseService",
+        ai: "AIService",
+        reminder: "ReminderService",
+        streak: "StreakService"
     ):
+        # Сервисы создаются в main.py, здесь только храним ссылки
         super().__init__()
         self.db = db
         self.ai = ai
         self.reminder = reminder
-        self.streak = StreakService(db)
+        self.streak = streak
+        self._streak_checked = TTLCache(
+            maxsize=self.STREAK_CHECK_CACHE_SIZE,
+            ttl=self.STREAK_CHECK_INTERVAL
+        )
     
     async def __call__(
         self,
@@ -48,13 +62,10 @@ class ServicesMiddleware(BaseMiddleware):
         data["streak"] = self.streak
         
         # Проверка streaks для сообщений и callback (кроме определенных команд)
-        user_id = None
-        if isinstance(event, Message):
-            user_id = event.from_user.id if event.from_user else None
-        elif isinstance(event, CallbackQuery):
-            user_id = event.from_user.id if event.from_user else None
+        from_user = getattr(event, "from_user", None)
+        user_id = from_user.id if from_user else None
         
-        if user_id:
+        if user_id and self._streak_checked.get(user_id) is None:
             try:
                 # Проверяем streaks (раз в час достаточно)
                 user = await self.db.get_user(user_id)
@@ -65,6 +76,8 @@ class ServicesMiddleware(BaseMiddleware):
                     if broken:
                         # Сохраняем информацию о broken streaks для уведомления
                         data["_broken_streaks"] = broken
+                if user:
+                    self._streak_checked.set(user_id, True)
             except Exception as e:
                 logger.error(f"Error checking streaks for user {user_id}: {e}")
         
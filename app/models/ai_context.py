@@ -14,8 +14,9 @@ from sqlalchemy import (
     String,
     Text,
     Float,
+    func,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 
@@ -31,7 +32,7 @@ class AIContext(Base):
     
     __tablename__ = "ai_contexts"
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
         BigInteger,
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -101,7 +102,8 @@ class AIContext(Base):
     context_updated_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
-        onupdate=datetime.utcnow
+        server_default=func.now(),
+        onupdate=func.now()
     )
     
     # Relationships
@@ -112,35 +114,57 @@ class AIContext(Base):
     
     def get_struggling_habits_list(self) -> list:
         """Возвращает список проблемных привычек."""
-        import json
+        import orjson
         if not self.struggling_habits:
             return []
         try:
-            return json.loads(self.struggling_habits)
-        except json.JSONDecodeError:
+            return orjson.loads(self.struggling_habits)
+        except orjson.JSONDecodeError:
             return []
     
     def set_struggling_habits(self, habits: list) -> None:
         """Сохраняет список проблемных привычек."""
-        import json
-        self.struggling_habits = json.dumps(habits[:5])  # Только топ-5
+        import orjson
+        self.struggling_habits = orjson.dumps(habits[:5]).decode()  # Только топ-5
     
     def get_successful_patterns_list(self) -> list:
         """Возвращает список успешных паттернов."""
-        import json
+        import orjson
         if not self.successful_patterns:
             return []
         try:
-            return json.loads(self.successful_patterns)
-        except json.JSONDecodeError:
+            return orjson.loads(self.successful_patterns)
+        except orjson.JSONDecodeError:
             return []
     
     def set_successful_patterns(self, patterns: list) -> None:
         """Сохраняет успешные паттерны."""
-        import json
-        self.successful_patterns = json.dumps(patterns[:5])
+        import orjson
+        self.successful_patterns = orjson.dumps(patterns[:5]).decode()
+    
+    @validates(
+        "most_productive_day",
+        "most_productive_time",
+        "struggling_habits",
+        "successful_patterns",
+        "average_mood",
+    )
+    def _reset_prompt_summary(self, key: str, value):
+        """Сбрасывает запомненное саммари при изменении входящих в него полей."""
+        self.__dict__.pop("_prompt_summary", None)
+        return value
     
     def get_summary_for_prompt(self) -> str:
+        """
+        Краткое саммари для AI-промпта.
+        Строится один раз и запоминается на объекте до изменения полей.
+        """
+        summary = self.__dict__.get("_prompt_summary")
+        if summary is None:
+            summary = self.__dict__["_prompt_summary"] = self._build_summary_for_prompt()
+        return summary
+    
+    def _build_summary_for_prompt(self) -> str:
         """
         Генерирует краткое саммари для AI-промпта.
         Оптимизировано по токенам.
@@ -14,6 +14,7 @@ class Base(DeclarativeBase):
     
     # Автоматическое добавление created_at и updated_at
     created_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow,
         server_default=func.now(),
         nullable=False
     )
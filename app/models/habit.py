@@ -4,6 +4,7 @@
 
 from datetime import date, datetime, time
 from enum import Enum as PyEnum
+from functools import cached_property
 from typing import TYPE_CHECKING, List, Optional
 
 from sqlalchemy import (
@@ -11,14 +12,17 @@ from sqlalchemy import (
     Boolean,
     Date,
     DateTime,
+    Enum,
     ForeignKey,
+    Index,
     Integer,
+    SmallInteger,
     String,
     Text,
-    Time,
     func,
+    text,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 
@@ -35,35 +39,101 @@ class HabitFrequency(str, PyEnum):
     CUSTOM = "custom"
 
 
+# Маски дней недели (бит 0 = понедельник, бит 6 = воскресенье)
+ALL_DAYS_MASK = 0x7F
+
+_FREQUENCY_MASKS = {
+    HabitFrequency.DAILY.value: ALL_DAYS_MASK,
+    HabitFrequency.WEEKDAYS.value: 0x1F,  # Пн-Пт
+    HabitFrequency.WEEKENDS.value: 0x60,  # Сб-Вс
+    HabitFrequency.WEEKLY.value: 0x01,    # Понедельник
+}
+
+
+def get_frequency_mask(frequency: Optional[str], custom_days: Optional[str] = None) -> int:
+    """
+    Битовая маска дней напоминаний для частоты привычки.
+    
+    Args:
+        frequency: Значение HabitFrequency
+        custom_days: Битовая маска строкой (для custom частоты)
+    
+    Returns:
+        Маска из 7 бит; при неизвестной частоте - все дни
+    """
+    if frequency == HabitFrequency.CUSTOM.value:
+        try:
+            return int(custom_days) & ALL_DAYS_MASK
+        except (TypeError, ValueError):
+            return ALL_DAYS_MASK
+    return _FREQUENCY_MASKS.get(frequency, ALL_DAYS_MASK)
+
+
 class Habit(Base):
     """Модель привычки пользователя."""
     
     __tablename__ = "habits"
+    __table_args__ = (
+        # Индексы из миграций - объявлены здесь, чтобы create_all их тоже создавал.
+        # idx_habits_user_active покрывает и выборки только по user_id
+        Index("idx_habits_user_active", "user_id", "is_active"),
+        Index("idx_habits_paused", "is_paused"),
+        # Список активных привычек пользователя (новые сверху) - без сортировки
+        Index(
+            "idx_habits_user_live",
+            "user_id",
+            "created_at",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1"),
+        ),
+        # Выборка напоминаний: частичный индекс только по активным привычкам
+        Index(
+            "idx_habits_due",
+            "reminder_minute",
+            postgresql_where=text("is_active AND NOT is_paused"),
+            sqlite_where=text("is_active = 1 AND is_paused = 0"),
+        ),
+    )
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
         BigInteger,
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     # Основная информация
     name: Mapped[str] = mapped_column(String(100), nullable=False)
-    description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Описание показывает только Mini App - бот его не читает
+    description: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
     emoji: Mapped[str] = mapped_column(String(10), default="✅")
     
     # Настройки времени
-    reminder_time: Mapped[Optional[time]] = mapped_column(Time, nullable=True)
-    frequency: Mapped[str] = mapped_column(
-        String(20),
-        default=HabitFrequency.DAILY.value
+    reminder_minute: Mapped[Optional[int]] = mapped_column(
+        SmallInteger,
+        nullable=True,
+        comment="Время напоминания в минутах от полуночи (0..1439), локальное"
+    )
+    frequency: Mapped[HabitFrequency] = mapped_column(
+        Enum(
+            HabitFrequency,
+            name="habit_frequency",
+            values_callable=lambda enum: [member.value for member in enum],
+            # В SQLite колонка - строка: без проверки мусор попал бы в БД
+            validate_strings=True
+        ),
+        default=HabitFrequency.DAILY
     )
     custom_days: Mapped[Optional[str]] = mapped_column(
         String(20),
         nullable=True,
         comment="Битовая маска дней недели для custom частоты"
     )
+    reminder_mask: Mapped[int] = mapped_column(
+        SmallInteger,
+        default=ALL_DAYS_MASK,
+        comment="Дни напоминаний (бит 0 = Пн), вычисляется из frequency/custom_days"
+    )
     
     # Цели и прогресс
     target_days: Mapped[int] = mapped_column(
@@ -74,6 +144,11 @@ class Habit(Base):
     current_streak: Mapped[int] = mapped_column(Integer, default=0)
     best_streak: Mapped[int] = mapped_column(Integer, default=0)
     total_completions: Mapped[int] = mapped_column(Integer, default=0)
+    last_completed_date: Mapped[Optional[date]] = mapped_column(
+        Date,
+        nullable=True,
+        comment="Дата последнего выполнения (чтобы не читать логи ради is_completed_today)"
+    )
     
     # Статус
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
@@ -82,87 +157,112 @@ class Habit(Base):
         default=False,
         comment="Приостановлена ли привычка (временно отключена)"
     )
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # AI-контекст
     ai_suggested: Mapped[bool] = mapped_column(Boolean, default=False)
     
-    # Relationships
+    # Relationships (логи загружаются только явно через selectinload)
     user: Mapped["User"] = relationship("User", back_populates="habits")
     logs: Mapped[List["HabitLog"]] = relationship(
         "HabitLog",
         back_populates="habit",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
         order_by="desc(HabitLog.completed_date)"
     )
     
     def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.id}>"
+    
+    def __str__(self) -> str:
         return f"<Habit(id={self.id}, name={self.name}, user_id={self.user_id})>"
     
     @property
+    def reminder_time(self) -> Optional[time]:
+        """Время напоминания как time (для UI и API)."""
+        if self.reminder_minute is None:
+            return None
+        return time(*divmod(self.reminder_minute, 60))
+    
+    @reminder_time.setter
+    def reminder_time(self, value: Optional[time]) -> None:
+        self.reminder_minute = value.hour * 60 + value.minute if value else None
+    
+    @cached_property
     def progress_percentage(self) -> float:
-        """Процент выполнения цели."""
+        """Процент выполнения цели (кэшируется до изменения счетчиков)."""
         if self.target_days == 0:
             return 0.0
         return min(100.0, (self.total_completions / self.target_days) * 100)
     
+    @validates("total_completions", "target_days")
+    def _reset_progress_percentage(self, key: str, value: int) -> int:
+        """Сбрасывает запомненный процент при изменении входящих в него полей."""
+        self.__dict__.pop("progress_percentage", None)
+        return value
+    
     @property
     def is_completed_today(self) -> bool:
         """Проверка, выполнена ли привычка сегодня."""
-        today = date.today()
-        for log in self.logs:
-            if log.completed_date == today and log.status == "completed":
-                return True
-        return False
+        return self.last_completed_date == date.today()
+    
+    @validates("frequency", "custom_days")
+    def _sync_reminder_mask(self, key: str, value: Optional[str]) -> Optional[str]:
+        """Пересчет reminder_mask при изменении частоты."""
+        frequency = value if key == "frequency" else self.frequency
+        custom_days = value if key == "custom_days" else self.custom_days
+        self.reminder_mask = get_frequency_mask(frequency, custom_days)
+        return value
     
     def should_remind_today(self, current_date: date = None) -> bool:
         """Проверка, нужно ли напоминание на сегодня."""
         if not current_date:
             current_date = date.today()
         
-        weekday = current_date.weekday()  # 0=Monday, 6=Sunday
-        
-        if self.frequency == HabitFrequency.DAILY.value:
-            return True
-        elif self.frequency == HabitFrequency.WEEKDAYS.value:
-            return weekday < 5  # Пн-Пт
-        elif self.frequency == HabitFrequency.WEEKENDS.value:
-            return weekday >= 5  # Сб-Вс
-        elif self.frequency == HabitFrequency.WEEKLY.value:
-            # Напоминание в день создания или первый день недели
-            return weekday == 0
-        elif self.frequency == HabitFrequency.CUSTOM.value and self.custom_days:
-            # custom_days - битовая маска
-            try:
-                mask = int(self.custom_days)
-                return bool(mask & (1 << weekday))
-            except ValueError:
-                return True
-        return True
+        # weekday(): 0=Monday, 6=Sunday
+        return bool(self.reminder_mask & (1 << current_date.weekday()))
 
 
 class HabitLog(Base):
     """Лог выполнения/пропуска привычки."""
     
     __tablename__ = "habit_logs"
+    __table_args__ = (
+        # Составные индексы покрывают и выборки по user_id / habit_id.
+        # INCLUDE (PostgreSQL) дает index-only scan агрегатам по статусу
+        Index(
+            "idx_logs_user_date", "user_id", "completed_date",
+            postgresql_include=["habit_id", "status"]
+        ),
+        Index(
+            "idx_logs_habit", "habit_id", "completed_date",
+            postgresql_include=["status"]
+        ),
+        # Выборки по дате по всей таблице (админ-статистика). Логи пишутся
+        # в порядке дат, поэтому на PostgreSQL хватает крошечного BRIN,
+        # в SQLite BRIN нет - там обычный btree
+        Index(
+            "idx_logs_date_brin", "completed_date",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32}
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_habit_logs_completed_date", "completed_date").ddl_if(dialect="sqlite"),
+    )
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     habit_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("habits.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
     user_id: Mapped[int] = mapped_column(
         BigInteger,
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     # Дата выполнения
-    completed_date: Mapped[date] = mapped_column(Date, nullable=False, index=True)
+    completed_date: Mapped[date] = mapped_column(Date, nullable=False)
     
     # Статус: completed, skipped, failed
     status: Mapped[str] = mapped_column(String(20), default="completed")
@@ -170,7 +270,8 @@ class HabitLog(Base):
     # Дополнительные данные
     completed_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=datetime.utcnow
+        default=datetime.utcnow,
+        server_default=func.now()
     )
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     mood: Mapped[Optional[int]] = mapped_column(
@@ -184,6 +285,9 @@ class HabitLog(Base):
     user: Mapped["User"] = relationship("User", back_populates="habit_logs")
     
     def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.id}>"
+    
+    def __str__(self) -> str:
         return (
             f"<HabitLog(id={self.id}, habit_id={self.habit_id}, "
             f"date={self.completed_date}, status={self.status})>"
@@ -4,10 +4,12 @@
 """
 
 from datetime import datetime
+from functools import cached_property
 from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Integer, String
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import JSON, BigInteger, Boolean, DateTime, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 
@@ -20,9 +22,12 @@ class User(Base):
     """Модель пользователя Telegram."""
     
     __tablename__ = "users"
+    __table_args__ = (
+        Index("idx_users_notifications", "notification_enabled"),
+    )
     
     # Telegram ID как первичный ключ
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     
     # Профиль
     username: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
@@ -50,26 +55,31 @@ class User(Base):
     streak_days: Mapped[int] = mapped_column(Integer, default=0)
     total_completions: Mapped[int] = mapped_column(Integer, default=0)
     last_active: Mapped[datetime] = mapped_column(
-        DateTime, 
+        DateTime,
         default=datetime.utcnow,
-        onupdate=datetime.utcnow
+        server_default=func.now(),
+        onupdate=func.now()
     )
     
     # Состояние для FSM (хранение промежуточных данных)
-    temp_data: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    temp_data: Mapped[Optional[dict]] = mapped_column(
+        JSON().with_variant(JSONB(), "postgresql"),
+        nullable=True,
+        deferred=True
+    )
     
-    # Relationships
+    # Relationships (коллекции загружаются только явно через selectinload)
     habits: Mapped[List["Habit"]] = relationship(
         "Habit",
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise_on_sql"
     )
     habit_logs: Mapped[List["HabitLog"]] = relationship(
         "HabitLog",
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy="selectin"
+        lazy="raise_on_sql"
     )
     ai_context: Mapped[Optional["AIContext"]] = relationship(
         "AIContext",
@@ -79,18 +89,28 @@ class User(Base):
     )
     
     def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.id}>"
+    
+    def __str__(self) -> str:
         return f"<User(id={self.id}, username={self.username}, name={self.first_name})>"
     
-    @property
+    @cached_property
     def full_name(self) -> str:
         """Полное имя пользователя."""
         if self.last_name:
             return f"{self.first_name} {self.last_name}"
         return self.first_name
     
-    @property
+    @cached_property
     def mention(self) -> str:
         """Упоминание пользователя (username или имя)."""
         if self.username:
             return f"@{self.username}"
         return self.full_name
+    
+    @validates("first_name", "last_name", "username")
+    def _reset_display_names(self, key: str, value: Optional[str]) -> Optional[str]:
+        """Сбрасывает запомненные full_name и mention при изменении имени."""
+        self.__dict__.pop("full_name", None)
+        self.__dict__.pop("mention", None)
+        return value
@@ -5,5 +5,6 @@
 from app.services.database import DatabaseService
 from app.services.ai_service import AIService
 from app.services.reminder_service import ReminderService
+from app.services.streak_service import StreakService
 
-__all__ = ["DatabaseService", "AIService", "ReminderService"]
+__all__ = ["DatabaseService", "AIService", "ReminderService", "StreakService"]
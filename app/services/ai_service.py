@@ -3,19 +3,81 @@
 Обеспечивает AI-рекомендации и персонализированные напоминания.
 """
 
-import json
+import asyncio
 import logging
-from datetime import datetime, date
-from typing import List, Optional, Dict, Any
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from weakref import WeakValueDictionary
 
 import aiohttp
+import orjson
 
-from app.config import settings
+from app.config import get_settings
 from app.models import User, Habit, HabitLog, AIContext
 from app.services.database import DatabaseService
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+def _json_dumps(value) -> str:
+    """Сериализация тела запросов к OpenRouter через orjson."""
+    return orjson.dumps(value).decode()
+
+
+# Callback для частичного текста потокового ответа
+PartialCallback = Callable[[str], Awaitable[None]]
+
+# Системные промпты неизменны между запросами: провайдеры кэшируют
+# совпадающий префикс, поэтому всё статичное идёт первым, данные - последними
+RECOMMENDATION_SYSTEM_PROMPT = """Ты - дружелюбный помощник по формированию привычек. 
+Давай краткие, конкретные советы на русском языке (2-3 предложения).
+Будь мотивирующим, но не навязчивым."""
+
+GENERAL_RECOMMENDATION_SYSTEM_PROMPT = """Ты - мотиватор по формированию привычек. 
+Дай один конкретный, вдохновляющий совет на русском языке (2-3 предложения)."""
+
+SYSTEM_PROMPT_STRICT = """Ты строгий, но заботливый тренер. 
+Напомни о привычке кратко и по делу (1-2 предложения). Без воды."""
+
+SYSTEM_PROMPT_MOTIVATIONAL = """Ты энергичный мотиватор. 
+Напомни о привычке с энтузиазмом и позитивом (2-3 предложения)."""
+
+SYSTEM_PROMPT_FRIENDLY = """Ты дружелюбный помощник. 
+Напомни о привычке тепло и поддерживающе (2 предложения)."""
+
+REMINDER_SYSTEM_PROMPTS = {
+    "strict": SYSTEM_PROMPT_STRICT,
+    "motivational": SYSTEM_PROMPT_MOTIVATIONAL,
+    "friendly": SYSTEM_PROMPT_FRIENDLY,
+}
+
+USER_STATE_DELIMITER = "--- USER STATE ---"
+
+WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Время суток по часу: 5-11 утро, 12-16 день, остальное вечер
+HOUR_BUCKETS = tuple(
+    "morning" if 5 <= hour < 12 else "afternoon" if 12 <= hour < 17 else "evening"
+    for hour in range(24)
+)
+
+
+@dataclass(frozen=True)
+class _PromptContext:
+    """Поля AI-контекста, нужные промптам, - простые значения вместо ORM-строки."""
+    summary: str
+    reminder_style: str
+    
+    @classmethod
+    def from_model(cls, ai_context: AIContext) -> "_PromptContext":
+        return cls(
+            summary=ai_context.get_summary_for_prompt(),
+            reminder_style=ai_context.preferred_reminder_style or "friendly"
+        )
+
 
 class AIService:
     """Сервис для работы с AI через OpenRouter API."""
@@ -24,21 +86,92 @@ class AIService:
     DEFAULT_MODEL = "meta-llama/llama-3.1-8b-instruct"
     FALLBACK_MODEL = "mistralai/mistral-7b-instruct"
     
+    # Повторы при временных ошибках OpenRouter (на каждую модель)
+    RETRY_ATTEMPTS = 3
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    RETRY_BACKOFF_BASE = 0.5
+    RETRY_BACKOFF_MAX = 30.0
+    
+    # Кэш рекомендаций: одинаковое состояние привычки -> тот же совет
+    RECOMMENDATION_CACHE_SIZE = 10_000
+    RECOMMENDATION_CACHE_TTL = 3 * 86400
+    
+    # Напоминания: повтор для той же привычки в тот же день (snooze, ручное
+    # напоминание) не требует нового запроса к модели
+    REMINDER_CACHE_SIZE = 2000
+    REMINDER_CACHE_TTL = 6 * 3600
+    
+    # Поля AI-контекста для промптов кэшируются коротко: за цикл напоминаний
+    # они не меняются. Сама ORM-строка в кэш не попадает
+    AI_CONTEXT_CACHE_SIZE = 4096
+    AI_CONTEXT_CACHE_TTL = 60
+    
+    # Сколько запросов к OpenRouter выполнять одновременно при массовой генерации
+    REMINDER_CONCURRENCY = 20
+    
+    # Как часто отдавать частичный текст при потоковом ответе (Telegram
+    # не любит частые edit_message_text одного сообщения)
+    STREAM_FLUSH_INTERVAL = 1.0
+    
+    # Сколько запросов логов выполнять одновременно при анализе паттернов
+    LOGS_FETCH_CONCURRENCY = 16
+    
     def __init__(self, db_service: DatabaseService):
+        settings = get_settings()
         self.db = db_service
         self.api_key = settings.openrouter_api_key or ""
         self.base_url = settings.openrouter_base_url
         self.model = settings.openrouter_model or self.DEFAULT_MODEL
         self.enabled = bool(settings.openrouter_api_key)
         
-        # Сессия будет создаваться при необходимости
+        # Одна долгоживущая сессия на весь процесс (создаётся при первом запросе)
         self._session: Optional[aiohttp.ClientSession] = None
+        self._closed = False
+        
+        # Фоновые задачи (сильные ссылки, чтобы их не собрал GC)
+        self._pending: Set[asyncio.Task] = set()
+        # Блокировка записи контекста на пользователя: медленная запись
+        # одного пользователя не задерживает сохранения остальных
+        self._context_write_locks: "WeakValueDictionary[int, asyncio.Lock]" = WeakValueDictionary()
+        
+        self._rec_cache = TTLCache(
+            maxsize=self.RECOMMENDATION_CACHE_SIZE,
+            ttl=self.RECOMMENDATION_CACHE_TTL
+        )
+        self._context_cache = TTLCache(
+            maxsize=self.AI_CONTEXT_CACHE_SIZE,
+            ttl=self.AI_CONTEXT_CACHE_TTL
+        )
+        self._reminder_cache = TTLCache(
+            maxsize=self.REMINDER_CACHE_SIZE,
+            ttl=self.REMINDER_CACHE_TTL
+        )
+    
+    async def __aenter__(self) -> "AIService":
+        await self._get_session()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Получение HTTP-сессии (lazy initialization)."""
-        if self._session is None or self._session.closed:
+        """Получение HTTP-сессии (создаётся один раз и переиспользуется)."""
+        if self._closed:
+            raise RuntimeError("AIService is closed")
+        
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+                enable_cleanup_closed=True
+            )
             timeout = aiohttp.ClientTimeout(total=30, connect=10)
             self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                json_serialize=_json_dumps,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json",
@@ -50,16 +183,34 @@ class AIService:
         return self._session
     
     async def close(self) -> None:
-        """Закрытие HTTP-сессии."""
+        """Закрытие HTTP-сессии (вместе с пулом соединений)."""
+        # Дожидаемся фоновых записей до закрытия
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        
+        self._closed = True
         if self._session and not self._session.closed:
             await self._session.close()
     
+    def _run_in_background(self, coro: Awaitable[None]) -> None:
+        """Запуск корутины в фоне с удержанием ссылки до завершения."""
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._on_background_done)
+    
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        """Снятие ссылки на завершенную фоновую задачу и логирование ошибки."""
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background AI task failed: {task.exception()}")
+    
     async def _make_request(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 500,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        on_partial: Optional[PartialCallback] = None
     ) -> Optional[str]:
         """
         Выполнение запроса к OpenRouter API.
@@ -71,6 +222,8 @@ class AIService:
             temperature: Температура генерации (0-1)
             max_tokens: Максимальное количество токенов
             model: Модель (если None - используется дефолтная)
+            on_partial: Если задан - ответ запрашивается потоком (stream),
+                и накопленный текст периодически передается в callback
         
         Returns:
             Текст ответа или None при ошибке
@@ -80,44 +233,125 @@ class AIService:
             
         session = await self._get_session()
         
-        payload = {
-            "model": model or self.model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
+        # Сначала запрошенная модель, затем fallback
+        models = [model or self.model]
+        if models[0] != self.FALLBACK_MODEL:
+            models.append(self.FALLBACK_MODEL)
         
-        try:
-            async with session.post(
-                f"{self.base_url}/chat/completions",
-                json=payload
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"OpenRouter API error: {response.status} - {error_text}")
-                    
-                    # Пробуем fallback модель
-                    if model != self.FALLBACK_MODEL:
-                        logger.info(f"Trying fallback model: {self.FALLBACK_MODEL}")
-                        return await self._make_request(
-                            messages, temperature, max_tokens, self.FALLBACK_MODEL
-                        )
-                    return None
+        for current_model in models:
+            if current_model != models[0]:
+                logger.info(f"Trying fallback model: {current_model}")
+            
+            payload = {
+                "model": current_model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            }
+            if on_partial is not None:
+                payload["stream"] = True
+            
+            for attempt in range(self.RETRY_ATTEMPTS):
+                is_last_attempt = attempt == self.RETRY_ATTEMPTS - 1
                 
-                data = await response.json()
+                try:
+                    async with session.post(
+                        f"{self.base_url}/chat/completions",
+                        json=payload
+                    ) as response:
+                        if response.status != 200:
+                            error_text = await response.text()
+                            
+                            # Временные ошибки (rate limit, 5xx) - повторяем с паузой
+                            if response.status in self.RETRY_STATUSES and not is_last_attempt:
+                                delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+                                logger.warning(
+                                    f"OpenRouter API error: {response.status}, "
+                                    f"retrying in {delay:.1f}s"
+                                )
+                                await asyncio.sleep(delay)
+                                continue
+                            
+                            logger.error(f"OpenRouter API error: {response.status} - {error_text}")
+                            break  # следующая модель
+                        
+                        if on_partial is not None:
+                            return await self._read_stream(response, on_partial)
+                        
+                        # orjson разбирает bytes напрямую, без промежуточной str
+                        data = orjson.loads(await response.read())
+                        
+                        if "choices" in data and len(data["choices"]) > 0:
+                            return data["choices"][0]["message"]["content"].strip()
+                        else:
+                            logger.error(f"Unexpected response format: {data}")
+                            return None
                 
-                if "choices" in data and len(data["choices"]) > 0:
-                    return data["choices"][0]["message"]["content"].strip()
-                else:
-                    logger.error(f"Unexpected response format: {data}")
-                    return None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if is_last_attempt:
+                        logger.error(f"Network error when calling OpenRouter: {e}")
+                        return None
                     
-        except aiohttp.ClientError as e:
-            logger.error(f"Network error when calling OpenRouter: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Unexpected error in AI request: {e}")
-            return None
+                    delay = self._retry_delay(attempt)
+                    logger.warning(f"Network error when calling OpenRouter: {e}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    logger.error(f"Unexpected error in AI request: {e}")
+                    return None
+        
+        return None
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Пауза перед повтором: Retry-After сервера или экспонента с jitter."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.RETRY_BACKOFF_MAX)
+            except ValueError:
+                pass  # Retry-After в виде HTTP-даты - считаем сами
+        
+        return random.uniform(0, min(self.RETRY_BACKOFF_MAX, self.RETRY_BACKOFF_BASE * 2 ** attempt))
+    
+    async def _read_stream(
+        self,
+        response: aiohttp.ClientResponse,
+        on_partial: PartialCallback
+    ) -> Optional[str]:
+        """
+        Чтение SSE-ответа chat completion (stream=True).
+        
+        Накопленный текст отдается в on_partial не чаще STREAM_FLUSH_INTERVAL.
+        """
+        parts: List[str] = []
+        last_flush = time.monotonic()
+        
+        async for raw_line in response.content:
+            line = raw_line.strip()
+            # Пустые строки и комментарии (": OPENROUTER PROCESSING") пропускаем
+            if not line.startswith(b"data:"):
+                continue
+            
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
+            
+            try:
+                delta = orjson.loads(data)["choices"][0]["delta"].get("content")
+            except (ValueError, KeyError, IndexError):
+                continue
+            if not delta:
+                continue
+            
+            parts.append(delta)
+            now = time.monotonic()
+            if now - last_flush >= self.STREAM_FLUSH_INTERVAL:
+                last_flush = now
+                try:
+                    await on_partial("".join(parts))
+                except Exception as e:
+                    logger.debug(f"Partial response callback failed: {e}")
+        
+        text = "".join(parts).strip()
+        return text or None
     
     # ==================== AI Рекомендации ====================
     
@@ -125,7 +359,8 @@ class AIService:
         self,
         user: User,
         habit: Optional[Habit] = None,
-        recent_logs: Optional[List[HabitLog]] = None
+        recent_logs: Optional[List[HabitLog]] = None,
+        on_partial: Optional[PartialCallback] = None
     ) -> str:
         """
         Генерация AI-рекомендации по привычке на основе истории.
@@ -134,6 +369,7 @@ class AIService:
             user: Пользователь
             habit: Конкретная привычка (если None - общая рекомендация)
             recent_logs: Недавние логи (если None - загружаются из БД)
+            on_partial: Callback для частичного текста (потоковый ответ)
         
         Returns:
             Текст рекомендации
@@ -142,56 +378,74 @@ class AIService:
         if not self.enabled:
             return self._get_fallback_recommendation(habit)
         
-        # Получаем AI-контекст пользователя
-        ai_context = await self.db.get_or_create_ai_context(user.id)
+        # AI-контекст и данные привычек независимы - загружаем одновременно
+        habits: List[Habit] = []
+        if habit and not recent_logs:
+            ai_context, recent_logs = await asyncio.gather(
+                self._get_ai_context(user.id),
+                self.db.get_habit_logs(habit.id, user.id, days=14)
+            )
+        elif habit:
+            ai_context = await self._get_ai_context(user.id)
+        else:
+            ai_context, habits = await asyncio.gather(
+                self._get_ai_context(user.id),
+                self.db.get_user_habits(user.id)
+            )
         
         # Формируем контекст для промпта
-        context_summary = ai_context.get_summary_for_prompt()
-        
-        # Получаем логи если не переданы
-        if habit and not recent_logs:
-            recent_logs = await self.db.get_habit_logs(habit.id, user.id, days=14)
+        context_summary = ai_context.summary
         
         # Формируем историю выполнения (кратко для экономии токенов)
         history_summary = self._format_history_summary(recent_logs or [])
         
+        # Для конкретной привычки ответ определяется её состоянием - смотрим кэш
+        cache_key = None
+        if habit:
+            cache_key = (habit.id, self._streak_bucket(habit.current_streak), history_summary)
+            cached = self._rec_cache.get(cache_key)
+            if cached:
+                return cached
+        
         # Формируем промпт
         if habit:
-            system_prompt = """Ты - дружелюбный помощник по формированию привычек. 
-Давай краткие, конкретные советы на русском языке (2-3 предложения).
-Будь мотивирующим, но не навязчивым."""
+            system_prompt = RECOMMENDATION_SYSTEM_PROMPT
             
-            user_prompt = f"""Привычка: {habit.name}
+            user_prompt = f"""Дай персонализированный совет по улучшению выполнения этой привычки.
+{USER_STATE_DELIMITER}
+Привычка: {habit.name}
 Эмодзи: {habit.emoji}
 Текущая серия: {habit.current_streak} дней
 Лучшая серия: {habit.best_streak} дней
 История (14 дней): {history_summary}
-Контекст пользователя: {context_summary}
-
-Дай персонализированный совет по улучшению выполнения этой привычки."""
+Контекст пользователя: {context_summary}"""
         else:
             # Общая рекомендация
-            habits = await self.db.get_user_habits(user.id)
             habits_info = ", ".join([f"{h.emoji} {h.name} (серия: {h.current_streak})" for h in habits[:5]])
             
-            system_prompt = """Ты - мотиватор по формированию привычек. 
-Дай один конкретный, вдохновляющий совет на русском языке (2-3 предложения)."""
+            system_prompt = GENERAL_RECOMMENDATION_SYSTEM_PROMPT
             
-            user_prompt = f"""Привычки пользователя: {habits_info or "пока нет"}
-Контекст: {context_summary}
-
-Дай общий совет по формированию полезных привычек."""
+            user_prompt = f"""Дай общий совет по формированию полезных привычек.
+{USER_STATE_DELIMITER}
+Привычки пользователя: {habits_info or "пока нет"}
+Контекст: {context_summary}"""
         
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
         
-        response = await self._make_request(messages, temperature=0.8, max_tokens=300)
+        response = await self._make_request(
+            messages, temperature=0.8, max_tokens=300, on_partial=on_partial
+        )
         
         if response:
-            # Сохраняем рекомендацию в контекст
-            await self._save_recommendation_to_context(user.id, response)
+            if cache_key:
+                self._rec_cache.set(cache_key, response)
+            # Сохраняем рекомендацию в контекст в фоне - ответ пользователю не ждет записи
+            self._run_in_background(
+                self._save_recommendation_to_context(user.id, response)
+            )
             return response
         
         # Fallback на шаблонный ответ
@@ -218,42 +472,33 @@ class AIService:
         """
         # Если AI не настроен, возвращаем стандартное напоминание
         if not self.enabled:
-            return (
-                f"{habit.emoji} Не забудь про привычку \"{habit.name}\"! "
-                f"Текущая серия: {habit.current_streak} дней 💪"
-            )
+            return self._get_fallback_reminder(habit)
         
         # Получаем AI-контекст
-        ai_context = await self.db.get_or_create_ai_context(user.id)
+        ai_context = await self._get_ai_context(user.id)
         
         # Определяем время суток
         if not time_of_day and habit.reminder_time:
-            hour = habit.reminder_time.hour
-            if 5 <= hour < 12:
-                time_of_day = "morning"
-            elif 12 <= hour < 17:
-                time_of_day = "afternoon"
-            else:
-                time_of_day = "evening"
+            time_of_day = HOUR_BUCKETS[habit.reminder_time.hour]
         
         # Определяем день недели
         if not day_of_week:
-            days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-            day_of_week = days[datetime.now().weekday()]
+            day_of_week = WEEKDAY_NAMES[datetime.now().weekday()]
         
         # Определяем стиль напоминания
-        style = ai_context.preferred_reminder_style or "friendly"
+        style = ai_context.reminder_style
         
-        # Формируем промпт в зависимости от стиля
-        if style == "strict":
-            system_prompt = """Ты строгий, но заботливый тренер. 
-Напомни о привычке кратко и по делу (1-2 предложения). Без воды."""
-        elif style == "motivational":
-            system_prompt = """Ты энергичный мотиватор. 
-Напомни о привычке с энтузиазмом и позитивом (2-3 предложения)."""
-        else:  # friendly
-            system_prompt = """Ты дружелюбный помощник. 
-Напомни о привычке тепло и поддерживающе (2 предложения)."""
+        # Серия входит в текст напоминания, поэтому она часть ключа
+        cache_key = (
+            user.id, habit.id, habit.current_streak, style,
+            time_of_day, day_of_week, date.today()
+        )
+        cached = self._reminder_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Системный промпт в зависимости от стиля
+        system_prompt = REMINDER_SYSTEM_PROMPTS.get(style, SYSTEM_PROMPT_FRIENDLY)
         
         # Контекст для персонализации
         context_parts = [f"серия: {habit.current_streak} дней"]
@@ -262,11 +507,12 @@ class AIService:
         elif habit.current_streak == 0:
             context_parts.append("начинаем заново")
         
-        user_prompt = f"""Напомни пользователю {user.first_name} о привычке "{habit.emoji} {habit.name}".
+        user_prompt = f"""Напиши персонализированное напоминание о привычке на русском языке.
+{USER_STATE_DELIMITER}
+Пользователь: {user.first_name}
+Привычка: "{habit.emoji} {habit.name}"
 Время: {time_of_day}, День: {day_of_week}
-Статус: {', '.join(context_parts)}
-
-Напиши персонализированное напоминание на русском языке."""
+Статус: {', '.join(context_parts)}"""
         
         messages = [
             {"role": "system", "content": system_prompt},
@@ -276,10 +522,43 @@ class AIService:
         response = await self._make_request(messages, temperature=0.7, max_tokens=200)
         
         if response:
+            self._reminder_cache.set(cache_key, response)
             return response
         
         # Fallback
-        return f"{habit.emoji} Не забудь про привычку \"{habit.name}\"! Текущая серия: {habit.current_streak} дней 💪"
+        return self._get_fallback_reminder(habit)
+    
+    async def generate_reminders_bulk(
+        self,
+        items: List[Tuple[User, Habit]]
+    ) -> List[str]:
+        """
+        Параллельная генерация напоминаний для пачки (пользователь, привычка).
+        
+        Одновременно выполняется не больше REMINDER_CONCURRENCY запросов.
+        При ошибке для элемента возвращается шаблонное напоминание.
+        
+        Returns:
+            Тексты напоминаний в порядке items
+        """
+        semaphore = asyncio.Semaphore(self.REMINDER_CONCURRENCY)
+        
+        async def generate(user: User, habit: Habit) -> str:
+            async with semaphore:
+                return await self.get_personalized_reminder(user, habit)
+        
+        results = await asyncio.gather(
+            *(generate(user, habit) for user, habit in items),
+            return_exceptions=True
+        )
+        
+        messages = []
+        for (user, habit), result in zip(items, results):
+            if isinstance(result, BaseException):
+                logger.error(f"AI reminder generation failed for habit {habit.id}: {result}")
+                result = self._get_fallback_reminder(habit)
+            messages.append(result)
+        return messages
     
     async def analyze_user_patterns(self, user_id: int) -> Dict[str, Any]:
         """
@@ -297,59 +576,52 @@ class AIService:
         if not habits:
             return {}
         
-        # Анализируем логи
-        all_logs = []
-        for habit in habits:
-            logs = await self.db.get_habit_logs(habit.id, user_id, days=90)
-            all_logs.extend(logs)
+        # Логи за 90 дней по всем привычкам загружаем параллельно
+        semaphore = asyncio.Semaphore(self.LOGS_FETCH_CONCURRENCY)
+        
+        async def fetch_logs(habit: Habit) -> List[HabitLog]:
+            async with semaphore:
+                return await self.db.get_habit_logs(habit.id, user_id, days=90)
+        
+        # Вместе с логами - агрегаты пропусков и AI-контекст
+        failure_stats, ai_context, *logs_by_habit = await asyncio.gather(
+            self.db.get_habit_failure_stats(user_id, days=30),
+            self.db.get_or_create_ai_context(user_id),
+            *(fetch_logs(h) for h in habits)
+        )
+        all_logs = [log for logs in logs_by_habit for log in logs]
         
         if not all_logs:
             return {}
         
-        # Определяем самый продуктивный день
-        day_counts = {i: 0 for i in range(7)}
+        # Гистограммы по дням недели и часам - за один проход по выполненным логам
+        day_counts = [0] * 7
+        hour_counts = [0] * 24
+        completed_total = 0
         for log in all_logs:
             if log.status == "completed":
                 day_counts[log.completed_date.weekday()] += 1
+                hour_counts[log.completed_at.hour if log.completed_at else 12] += 1
+                completed_total += 1
         
-        best_day = max(day_counts, key=day_counts.get)
-        day_names = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-        most_productive_day = day_names[best_day]
+        # Определяем самый продуктивный день
+        most_productive_day = WEEKDAY_NAMES[day_counts.index(max(day_counts))]
         
         # Определяем самое продуктивное время
-        hour_counts = {}
-        for log in all_logs:
-            if log.status == "completed":
-                hour = log.completed_at.hour if log.completed_at else 12
-                hour_counts[hour] = hour_counts.get(hour, 0) + 1
-        
-        if hour_counts:
-            best_hour = max(hour_counts, key=hour_counts.get)
-            if 5 <= best_hour < 12:
-                most_productive_time = "morning"
-            elif 12 <= best_hour < 17:
-                most_productive_time = "afternoon"
-            else:
-                most_productive_time = "evening"
+        if completed_total:
+            most_productive_time = HOUR_BUCKETS[hour_counts.index(max(hour_counts))]
         else:
             most_productive_time = None
         
-        # Определяем проблемные привычки
-        struggling_habits = []
-        for habit in habits:
-            logs = await self.db.get_habit_logs(habit.id, user_id, days=30)
-            if not logs:
-                continue
-            
-            failed_count = sum(1 for log in logs if log.status in ["failed", "skipped"])
-            total_count = len(logs)
-            
-            if total_count > 5 and failed_count / total_count > 0.5:
-                struggling_habits.append(habit.name)
+        # Определяем проблемные привычки (агрегация за 30 дней в одном запросе)
+        habit_names = {habit.id: habit.name for habit in habits}
+        struggling_habits = [
+            habit_names[habit_id]
+            for habit_id, total_count, failed_count in failure_stats
+            if habit_id in habit_names and total_count > 5 and failed_count / total_count > 0.5
+        ]
         
         # Обновляем AI-контекст
-        ai_context = await self.db.get_or_create_ai_context(user_id)
-        
         update_data = {
             "most_productive_day": most_productive_day,
             "most_productive_time": most_productive_time,
@@ -359,7 +631,7 @@ class AIService:
             ai_context.set_struggling_habits(struggling_habits)
             update_data["struggling_habits"] = ai_context.struggling_habits
         
-        await self.db.update_ai_context(user_id, **update_data)
+        await self._update_ai_context(user_id, **update_data)
         
         return {
             "most_productive_day": most_productive_day,
@@ -370,19 +642,45 @@ class AIService:
     # ==================== Helper Methods ====================
     
     def _format_history_summary(self, logs: List[HabitLog]) -> str:
-        """Форматирование истории в краткую строку для промпта."""
+        """
+        Форматирование истории в краткую строку для промпта.
+        
+        Логи ожидаются от новых к старым (так их возвращает get_habit_logs).
+        """
         if not logs:
             return "нет данных"
         
-        # Группируем по статусу
-        completed = sum(1 for log in logs if log.status == "completed")
-        failed = sum(1 for log in logs if log.status in ["failed", "skipped"])
-        
-        # Проверяем паттерн (последние 3 записи)
-        recent = sorted(logs, key=lambda x: x.completed_date, reverse=True)[:3]
-        recent_pattern = ", ".join([log.status[:3] for log in recent])
+        # Один проход: счетчики по статусу и паттерн последних 3 записей
+        completed = failed = 0
+        recent = []
+        for i, log in enumerate(logs):
+            if log.status == "completed":
+                completed += 1
+            elif log.status in ("failed", "skipped"):
+                failed += 1
+            if i < 3:
+                recent.append(log.status[:3])
         
-        return f"выполнено:{completed}, пропущено:{failed}, последние:[{recent_pattern}]"
+        return f"выполнено:{completed}, пропущено:{failed}, последние:[{', '.join(recent)}]"
+    
+    @staticmethod
+    def _streak_bucket(streak: int) -> str:
+        """Грубая группировка серии для ключа кэша."""
+        if streak <= 0:
+            return "0"
+        if streak < 7:
+            return "1-6"
+        if streak < 30:
+            return "7-29"
+        return "30+"
+    
+    @staticmethod
+    def _get_fallback_reminder(habit: Habit) -> str:
+        """Шаблонное напоминание при недоступности AI."""
+        return (
+            f"{habit.emoji} Не забудь про привычку \"{habit.name}\"! "
+            f"Текущая серия: {habit.current_streak} дней 💪"
+        )
     
     def _get_fallback_recommendation(self, habit: Optional[Habit]) -> str:
         """Шаблонная рекомендация при недоступности AI."""
@@ -395,27 +693,50 @@ class AIService:
                 return f"🔥 Крутая серия в {habit.current_streak} дней! Продолжай в том же духе с '{habit.name}'."
         return "💡 Регулярность важнее интенсивности. Даже 5 минут в день лучше, чем час раз в неделю!"
     
+    async def _get_ai_context(self, user_id: int) -> _PromptContext:
+        """Поля AI-контекста для промптов с коротким in-process кэшем."""
+        prompt_context = self._context_cache.get(user_id)
+        if prompt_context is None:
+            ai_context = await self.db.get_or_create_ai_context(user_id)
+            prompt_context = _PromptContext.from_model(ai_context)
+            self._context_cache.set(user_id, prompt_context)
+        return prompt_context
+    
+    async def _update_ai_context(self, user_id: int, **kwargs) -> AIContext:
+        """Обновление AI-контекста (кэш получает свежие значения)."""
+        ai_context = await self.db.update_ai_context(user_id, **kwargs)
+        self._context_cache.set(user_id, _PromptContext.from_model(ai_context))
+        return ai_context
+    
     async def _save_recommendation_to_context(
         self,
         user_id: int,
         recommendation: str
     ) -> None:
         """Сохранение рекомендации в контекст (храним последние 5)."""
-        ai_context = await self.db.get_or_create_ai_context(user_id)
-        
-        try:
-            existing = json.loads(ai_context.last_ai_recommendations or "[]")
-        except json.JSONDecodeError:
-            existing = []
-        
-        # Добавляем новую и храним только последние 5
-        existing.append({
-            "date": datetime.now().isoformat(),
-            "text": recommendation[:200]  # Только начало для экономии места
-        })
-        existing = existing[-5:]
-        
-        await self.db.update_ai_context(
-            user_id,
-            last_ai_recommendations=json.dumps(existing, ensure_ascii=False)
-        )
+        # Чтение-изменение-запись: фоновые сохранения одного пользователя
+        # не должны перетирать друг друга
+        lock = self._context_write_locks.get(user_id)
+        if lock is None:
+            lock = self._context_write_locks[user_id] = asyncio.Lock()
+        
+        async with lock:
+            # Читаем строку из БД, а не из кэша: иначе потеряем чужую запись
+            ai_context = await self.db.get_or_create_ai_context(user_id)
+            
+            try:
+                existing = orjson.loads(ai_context.last_ai_recommendations or "[]")
+            except orjson.JSONDecodeError:
+                existing = []
+            
+            # Добавляем новую и храним только последние 5
+            existing.append({
+                "date": datetime.now().isoformat(),
+                "text": recommendation[:200]  # Только начало для экономии места
+            })
+            existing = existing[-5:]
+            
+            await self._update_ai_context(
+                user_id,
+                last_ai_recommendations=orjson.dumps(existing).decode()
+            )
@@ -3,24 +3,86 @@
 Реализует Repository Pattern для асинхронных операций с SQLAlchemy 2.0.
 """
 
+from contextlib import asynccontextmanager
 from datetime import date, datetime, timedelta
-from typing import List, Optional
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Sequence
 
-from sqlalchemy import select, update, delete, func, and_, or_, desc
+import orjson
+import pytz
+from sqlalchemy import bindparam, case, select, insert, update, delete, func, and_, or_, desc
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
-from app.config import settings
+from app.config import get_settings
 from app.models import Base, User, Habit, HabitLog, AIContext
-from app.models.habit import HabitFrequency
+from app.models.habit import HabitFrequency, get_frequency_mask
+
+
+# Горячие SELECT-запросы собираются один раз при импорте,
+# значения подставляются через bindparam при выполнении
+_GET_USER_HABITS = (
+    select(Habit)
+    .where(Habit.user_id == bindparam("user_id"))
+    .order_by(desc(Habit.created_at))
+)
+
+_GET_ACTIVE_USER_HABITS = (
+    select(Habit)
+    .where(and_(Habit.user_id == bindparam("user_id"), Habit.is_active == True))
+    .order_by(desc(Habit.created_at))
+)
+
+_GET_HABIT_LOGS = (
+    select(HabitLog)
+    .where(
+        and_(
+            HabitLog.habit_id == bindparam("habit_id"),
+            HabitLog.user_id == bindparam("user_id"),
+            HabitLog.completed_date >= bindparam("from_date")
+        )
+    )
+    .order_by(desc(HabitLog.completed_date))
+)
+
+_GET_DAY_LOGS = select(HabitLog).where(
+    and_(
+        HabitLog.user_id == bindparam("user_id"),
+        HabitLog.completed_date == bindparam("log_date")
+    )
+)
+
+
+@lru_cache(maxsize=512)
+def _get_timezone(name: str) -> pytz.BaseTzInfo:
+    """Часовой пояс по имени (UTC для неизвестных), с кэшем."""
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return pytz.UTC
+
+
+def _json_dumps(value) -> str:
+    """Сериализация JSON-колонок через orjson (драйверу нужна строка)."""
+    return orjson.dumps(value).decode()
 
 
 class DatabaseService:
     """Сервис для работы с базой данных."""
     
+    # Размер пачки для массовой вставки (одна транзакция на пачку)
+    BULK_CHUNK_SIZE = 10_000
+    
     def __init__(self):
+        settings = get_settings()
         self.engine = create_async_engine(
             settings.database_url,
-            echo=settings.log_level == "DEBUG"
+            echo=settings.log_level == "DEBUG",
+            json_serializer=_json_dumps,
+            json_deserializer=orjson.loads,
+            # Коротких запросов разной формы много - держим их компиляцию в кэше
+            query_cache_size=1200,
+            pool_pre_ping=True,
+            **settings.engine_pool_options
         )
         self.session_factory = async_sessionmaker(
             self.engine,
@@ -41,15 +103,38 @@ class DatabaseService:
         """Получение сессии БД."""
         return self.session_factory()
     
+    @asynccontextmanager
+    async def _session(
+        self,
+        session: Optional[AsyncSession] = None
+    ) -> AsyncIterator[AsyncSession]:
+        """
+        Переиспользование сессии вызывающего кода.
+        
+        Если сессия передана - работаем в ней (одно соединение из пула
+        на несколько чтений), иначе открываем новую на время вызова.
+        """
+        if session is not None:
+            yield session
+        else:
+            async with self.session_factory() as new_session:
+                yield new_session
+    
     # ==================== User Repository ====================
     
-    async def get_user(self, user_id: int) -> Optional[User]:
-        """Получение пользователя по ID."""
-        async with self.session_factory() as session:
-            result = await session.execute(
-                select(User).where(User.id == user_id)
-            )
-            return result.scalar_one_or_none()
+    async def get_user(
+        self,
+        user_id: int,
+        session: Optional[AsyncSession] = None
+    ) -> Optional[User]:
+        """
+        Получение пользователя по ID.
+        
+        session.get() сначала смотрит в identity map: повторный вызов
+        в переданной сессии обходится без запроса к БД.
+        """
+        async with self._session(session) as session:
+            return await session.get(User, user_id)
     
     async def create_user(
         self,
@@ -72,15 +157,17 @@ class DatabaseService:
             return user
     
     async def update_user(self, user_id: int, **kwargs) -> Optional[User]:
-        """Обновление данных пользователя."""
+        """Обновление данных пользователя (строка возвращается через RETURNING)."""
         async with self.session_factory() as session:
-            await session.execute(
+            result = await session.execute(
                 update(User)
                 .where(User.id == user_id)
                 .values(**kwargs)
+                .returning(User)
             )
+            user = result.scalar_one_or_none()
             await session.commit()
-            return await self.get_user(user_id)
+            return user
     
     async def get_or_create_user(
         self,
@@ -133,28 +220,30 @@ class DatabaseService:
             await session.refresh(habit)
             return habit
     
-    async def get_habit(self, habit_id: int, user_id: int) -> Optional[Habit]:
-        """Получение привычки по ID и user_id."""
-        async with self.session_factory() as session:
-            result = await session.execute(
-                select(Habit)
-                .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
-            )
-            return result.scalar_one_or_none()
+    async def get_habit(
+        self,
+        habit_id: int,
+        user_id: int,
+        session: Optional[AsyncSession] = None
+    ) -> Optional[Habit]:
+        """Получение привычки по ID и user_id (через identity map, как get_user)."""
+        async with self._session(session) as session:
+            habit = await session.get(Habit, habit_id)
+            if habit is None or habit.user_id != user_id:
+                return None
+            return habit
     
     async def get_user_habits(
         self,
         user_id: int,
-        active_only: bool = True
-    ) -> List[Habit]:
+        active_only: bool = True,
+        session: Optional[AsyncSession] = None
+    ) -> Sequence[Habit]:
         """Получение всех привычек пользователя."""
-        async with self.session_factory() as session:
-            query = select(Habit).where(Habit.user_id == user_id)
-            if active_only:
-                query = query.where(Habit.is_active == True)
-            query = query.order_by(desc(Habit.created_at))
-            result = await session.execute(query)
-            return list(result.scalars().all())
+        async with self._session(session) as session:
+            query = _GET_ACTIVE_USER_HABITS if active_only else _GET_USER_HABITS
+            result = await session.execute(query, {"user_id": user_id})
+            return result.scalars().all()
     
     async def update_habit(
         self,
@@ -164,13 +253,31 @@ class DatabaseService:
     ) -> Optional[Habit]:
         """Обновление привычки."""
         async with self.session_factory() as session:
-            await session.execute(
+            if "frequency" in kwargs or "custom_days" in kwargs:
+                # UPDATE в обход ORM (@validates не сработает) - маску дней
+                # считаем сами, недостающее значение берем из текущей строки
+                if "frequency" in kwargs and "custom_days" in kwargs:
+                    frequency, custom_days = kwargs["frequency"], kwargs["custom_days"]
+                else:
+                    current = (await session.execute(
+                        select(Habit.frequency, Habit.custom_days)
+                        .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
+                    )).one_or_none()
+                    if current is None:
+                        return None
+                    frequency = kwargs.get("frequency", current.frequency)
+                    custom_days = kwargs.get("custom_days", current.custom_days)
+                kwargs["reminder_mask"] = get_frequency_mask(frequency, custom_days)
+            
+            result = await session.execute(
                 update(Habit)
                 .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
                 .values(**kwargs)
+                .returning(Habit)
             )
+            habit = result.scalar_one_or_none()
             await session.commit()
-            return await self.get_habit(habit_id, user_id)
+            return habit
     
     async def delete_habit(self, habit_id: int, user_id: int) -> bool:
         """Удаление привычки."""
@@ -193,13 +300,20 @@ class DatabaseService:
         mood: Optional[int] = None,
         log_date: Optional[date] = None
     ) -> HabitLog:
-        """Запись выполнения/пропуска привычки."""
+        """
+        Запись выполнения/пропуска привычки.
+        
+        Все изменения - UPDATE/INSERT ... RETURNING без предварительных SELECT:
+        лог, счетчики привычки и пользователя обновляются выражениями в SQL
+        в одной транзакции.
+        """
         async with self.session_factory() as session:
             log_date = log_date or date.today()
+            completed = status == "completed"
             
-            # Проверяем, есть ли уже запись на эту дату
-            existing = await session.execute(
-                select(HabitLog)
+            # Обновляем запись на эту дату, если она уже есть
+            log = (await session.execute(
+                update(HabitLog)
                 .where(
                     and_(
                         HabitLog.habit_id == habit_id,
@@ -207,104 +321,257 @@ class DatabaseService:
                         HabitLog.completed_date == log_date
                     )
                 )
-            )
-            existing_log = existing.scalar_one_or_none()
+                .values(status=status, notes=notes, mood=mood, completed_at=func.now())
+                .returning(HabitLog)
+            )).scalars().first()
             
-            if existing_log:
-                # Обновляем существующую запись
-                existing_log.status = status
-                existing_log.notes = notes
-                existing_log.mood = mood
-                existing_log.completed_at = datetime.utcnow()
-                log = existing_log
-            else:
+            if log is None:
                 # Создаем новую запись
-                log = HabitLog(
-                    habit_id=habit_id,
-                    user_id=user_id,
-                    completed_date=log_date,
-                    status=status,
-                    notes=notes,
-                    mood=mood
-                )
-                session.add(log)
+                log = (await session.execute(
+                    insert(HabitLog)
+                    .values(
+                        habit_id=habit_id,
+                        user_id=user_id,
+                        completed_date=log_date,
+                        status=status,
+                        notes=notes,
+                        mood=mood
+                    )
+                    .returning(HabitLog)
+                )).scalar_one()
             
             # Обновляем статистику привычки
-            habit = await session.get(Habit, habit_id)
-            if habit:
-                if status == "completed":
-                    habit.total_completions += 1
-                    habit.current_streak += 1
-                    if habit.current_streak > habit.best_streak:
-                        habit.best_streak = habit.current_streak
-                else:
-                    habit.current_streak = 0
+            if completed:
+                habit_values = {
+                    "total_completions": Habit.total_completions + 1,
+                    "current_streak": Habit.current_streak + 1,
+                    "best_streak": case(
+                        (Habit.current_streak + 1 > Habit.best_streak, Habit.current_streak + 1),
+                        else_=Habit.best_streak
+                    ),
+                    "last_completed_date": case(
+                        (
+                            or_(
+                                Habit.last_completed_date.is_(None),
+                                Habit.last_completed_date < log_date
+                            ),
+                            log_date
+                        ),
+                        else_=Habit.last_completed_date
+                    ),
+                }
+            else:
+                habit_values = {
+                    "current_streak": 0,
+                    "last_completed_date": case(
+                        (Habit.last_completed_date == log_date, None),
+                        else_=Habit.last_completed_date
+                    ),
+                }
+            await session.execute(
+                update(Habit)
+                .where(Habit.id == habit_id)
+                .values(**habit_values)
+                .execution_options(synchronize_session=False)
+            )
             
             # Обновляем статистику пользователя
-            user = await session.get(User, user_id)
-            if user:
-                user.total_completions += 1 if status == "completed" else 0
-                user.last_active = datetime.utcnow()
+            await session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    total_completions=User.total_completions + (1 if completed else 0),
+                    last_active=func.now()
+                )
+                .execution_options(synchronize_session=False)
+            )
             
             await session.commit()
-            await session.refresh(log)
             return log
     
+    async def bulk_log_habits(self, rows: List[dict]) -> List[int]:
+        """
+        Массовая запись логов привычек без создания ORM-объектов.
+        
+        Все строки уходят одним INSERT (executemany) на пачку из
+        BULK_CHUNK_SIZE записей. Обновляется только last_completed_date
+        привычек, серии и счетчики не пересчитываются.
+        
+        Args:
+            rows: Словари с колонками HabitLog (habit_id, user_id,
+                completed_date, status, ...). Набор ключей должен совпадать.
+        
+        Returns:
+            ID созданных записей в порядке rows
+        """
+        if not rows:
+            return []
+        
+        ids: List[int] = []
+        async with self.session_factory() as session:
+            for start in range(0, len(rows), self.BULK_CHUNK_SIZE):
+                chunk = rows[start:start + self.BULK_CHUNK_SIZE]
+                result = await session.execute(
+                    insert(HabitLog).returning(HabitLog.id, sort_by_parameter_order=True),
+                    chunk
+                )
+                ids.extend(result.scalars().all())
+                
+                # Пересчитываем дату последнего выполнения затронутых привычек
+                completed_habit_ids = {
+                    row["habit_id"] for row in chunk
+                    if row.get("status", "completed") == "completed"
+                }
+                if completed_habit_ids:
+                    last_completed = (
+                        select(func.max(HabitLog.completed_date))
+                        .where(
+                            and_(
+                                HabitLog.habit_id == Habit.id,
+                                HabitLog.status == "completed"
+                            )
+                        )
+                        .scalar_subquery()
+                    )
+                    await session.execute(
+                        update(Habit)
+                        .where(Habit.id.in_(completed_habit_ids))
+                        .values(last_completed_date=last_completed)
+                        .execution_options(synchronize_session=False)
+                    )
+                
+                await session.commit()
+        return ids
+    
     async def get_habit_logs(
         self,
         habit_id: int,
         user_id: int,
-        days: int = 30
-    ) -> List[HabitLog]:
+        days: int = 30,
+        session: Optional[AsyncSession] = None
+    ) -> Sequence[HabitLog]:
         """Получение логов привычки за последние N дней."""
-        async with self.session_factory() as session:
+        async with self._session(session) as session:
             from_date = date.today() - timedelta(days=days)
             result = await session.execute(
-                select(HabitLog)
+                _GET_HABIT_LOGS,
+                {"habit_id": habit_id, "user_id": user_id, "from_date": from_date}
+            )
+            return result.scalars().all()
+    
+    async def get_habit_failure_stats(
+        self,
+        user_id: int,
+        days: int = 30,
+        session: Optional[AsyncSession] = None
+    ) -> List[tuple[int, int, int]]:
+        """
+        Статистика пропусков по привычкам пользователя за последние N дней.
+        
+        Returns:
+            Список (habit_id, всего логов, failed/skipped логов)
+        """
+        async with self._session(session) as session:
+            from_date = date.today() - timedelta(days=days)
+            result = await session.execute(
+                select(
+                    HabitLog.habit_id,
+                    func.count(),
+                    func.sum(
+                        case((HabitLog.status.in_(["failed", "skipped"]), 1), else_=0)
+                    )
+                )
                 .where(
                     and_(
-                        HabitLog.habit_id == habit_id,
                         HabitLog.user_id == user_id,
                         HabitLog.completed_date >= from_date
                     )
                 )
-                .order_by(desc(HabitLog.completed_date))
+                .group_by(HabitLog.habit_id)
+            )
+            return [tuple(row) for row in result.all()]
+    
+    async def get_last_completion_dates(
+        self,
+        user_id: int,
+        habit_ids: List[int],
+        since: date
+    ) -> Dict[int, date]:
+        """
+        Дата последнего выполнения каждой привычки начиная с since.
+        
+        Привычки без выполнений за период в результат не попадают.
+        """
+        if not habit_ids:
+            return {}
+        
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(HabitLog.habit_id, func.max(HabitLog.completed_date))
+                .where(
+                    and_(
+                        HabitLog.user_id == user_id,
+                        HabitLog.habit_id.in_(habit_ids),
+                        HabitLog.completed_date >= since,
+                        HabitLog.status == "completed"
+                    )
+                )
+                .group_by(HabitLog.habit_id)
             )
-            return list(result.scalars().all())
+            return dict(result.all())
     
-    async def get_today_logs(self, user_id: int) -> List[HabitLog]:
+    async def get_today_logs(
+        self,
+        user_id: int,
+        session: Optional[AsyncSession] = None
+    ) -> Sequence[HabitLog]:
         """Получение логов за сегодня."""
+        async with self._session(session) as session:
+            result = await session.execute(
+                _GET_DAY_LOGS, {"user_id": user_id, "log_date": date.today()}
+            )
+            return result.scalars().all()
+    
+    async def get_today_logs_for_users(
+        self,
+        user_ids: List[int]
+    ) -> Dict[int, List[HabitLog]]:
+        """
+        Логи за сегодня сразу для нескольких пользователей (один запрос).
+        
+        Returns:
+            {user_id: логи}; пользователи без логов получают пустой список
+        """
+        logs_by_user: Dict[int, List[HabitLog]] = {user_id: [] for user_id in user_ids}
+        if not user_ids:
+            return logs_by_user
+        
         async with self.session_factory() as session:
             result = await session.execute(
                 select(HabitLog)
                 .where(
                     and_(
-                        HabitLog.user_id == user_id,
+                        HabitLog.user_id.in_(user_ids),
                         HabitLog.completed_date == date.today()
                     )
                 )
             )
-            return list(result.scalars().all())
+            for log in result.scalars():
+                logs_by_user[log.user_id].append(log)
+        
+        return logs_by_user
     
     # ==================== Statistics ====================
     
-    async def get_user_stats(self, user_id: int) -> dict:
-        """Получение статистики пользователя."""
-        async with self.session_factory() as session:
-            # Общее количество привычек
-            habits_count = await session.execute(
-                select(func.count(Habit.id))
-                .where(Habit.user_id == user_id)
-            )
-            
-            # Активные привычки
-            active_habits = await session.execute(
-                select(func.count(Habit.id))
-                .where(and_(Habit.user_id == user_id, Habit.is_active == True))
-            )
-            
+    async def get_user_stats(
+        self,
+        user_id: int,
+        session: Optional[AsyncSession] = None
+    ) -> dict:
+        """Получение статистики пользователя (одним запросом)."""
+        async with self._session(session) as session:
             # Общее количество выполнений
-            total_completions = await session.execute(
+            completions = (
                 select(func.count(HabitLog.id))
                 .where(
                     and_(
@@ -312,21 +579,53 @@ class DatabaseService:
                         HabitLog.status == "completed"
                     )
                 )
+                .scalar_subquery()
             )
             
-            # Лучшая серия
-            best_streak = await session.execute(
-                select(func.max(Habit.best_streak))
+            result = await session.execute(
+                select(
+                    func.count(Habit.id).label("total_habits"),
+                    func.count(Habit.id).filter(Habit.is_active == True).label("active_habits"),
+                    completions.label("total_completions"),
+                    func.max(Habit.best_streak).label("best_streak"),
+                )
                 .where(Habit.user_id == user_id)
             )
+            row = result.one()
             
             return {
-                "total_habits": habits_count.scalar() or 0,
-                "active_habits": active_habits.scalar() or 0,
-                "total_completions": total_completions.scalar() or 0,
-                "best_streak": best_streak.scalar() or 0,
+                "total_habits": row.total_habits or 0,
+                "active_habits": row.active_habits or 0,
+                "total_completions": row.total_completions or 0,
+                "best_streak": row.best_streak or 0,
             }
     
+    async def apply_streak_check(
+        self,
+        user_id: int,
+        habit_ids: List[int],
+        checked_at: datetime
+    ) -> None:
+        """
+        Итог проверки серий пользователя одной транзакцией.
+        
+        Обнуляет текущую серию у habit_ids (одним UPDATE) и сохраняет
+        время проверки в users.last_streak_check.
+        """
+        async with self.session_factory() as session:
+            if habit_ids:
+                await session.execute(
+                    update(Habit)
+                    .where(and_(Habit.id.in_(habit_ids), Habit.user_id == user_id))
+                    .values(current_streak=0)
+                )
+            await session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(last_streak_check=checked_at)
+            )
+            await session.commit()
+    
     # ==================== AI Context ====================
     
     async def get_or_create_ai_context(self, user_id: int) -> AIContext:
@@ -346,38 +645,59 @@ class DatabaseService:
             return context
     
     async def update_ai_context(self, user_id: int, **kwargs) -> AIContext:
-        """Обновление AI-контекста."""
+        """Обновление AI-контекста (строка возвращается через RETURNING)."""
         async with self.session_factory() as session:
-            await session.execute(
+            result = await session.execute(
                 update(AIContext)
                 .where(AIContext.user_id == user_id)
                 .values(**kwargs)
+                .returning(AIContext)
             )
+            context = result.scalar_one_or_none()
             await session.commit()
-            return await self.get_or_create_ai_context(user_id)
+        
+        # Контекста еще нет - создаем (как и раньше, без применения kwargs)
+        return context or await self.get_or_create_ai_context(user_id)
     
     async def get_habits_for_reminder(
         self,
-        current_time: datetime,
-        window_minutes: int = 5
+        current_time: datetime
     ) -> List[tuple[Habit, User]]:
         """
-        Получение привычек для напоминаний на текущее время.
+        Получение привычек для напоминаний на текущую минуту.
+        
+        Вся фильтрация происходит в SQL одним запросом: для каждого часового
+        пояса пользователей вычисляется локальное время и день недели, и
+        привычка подходит, если reminder_minute совпадает с локальной минутой,
+        а в reminder_mask выставлен бит текущего дня. Уже выполненные
+        сегодня привычки (см. Habit.is_completed_today) отсекаются там же.
         
-        Оптимизировано: фильтрация по времени происходит в SQL.
-        Проверяет привычки с reminder_time в окне [current_time - window_minutes, current_time + window_minutes]
+        Args:
+            current_time: Текущее время в UTC (naive)
         """
         async with self.session_factory() as session:
-            from sqlalchemy.orm import joinedload
-            from sqlalchemy import cast, Time
-            import pytz
+            # Часовые поясы пользователей, которым вообще шлем напоминания
+            timezones = await session.execute(
+                select(User.timezone)
+                .where(User.notification_enabled == True)
+                .distinct()
+            )
+            
+            utc_now = current_time.replace(tzinfo=pytz.UTC)
+            slot_conditions = []
+            for tz_name in timezones.scalars().all():
+                local_now = utc_now.astimezone(_get_timezone(tz_name))
+                slot_conditions.append(
+                    and_(
+                        User.timezone == tz_name,
+                        Habit.reminder_minute == local_now.hour * 60 + local_now.minute,
+                        Habit.reminder_mask.op("&")(1 << local_now.weekday()) != 0
+                    )
+                )
             
-            # Вычисляем границы окна времени
-            time_window_start = (current_time - timedelta(minutes=window_minutes)).time()
-            time_window_end = (current_time + timedelta(minutes=window_minutes)).time()
+            if not slot_conditions:
+                return []
             
-            # Базовый запрос с оптимизацией
-            # Используем cast для корректного сравнения Time полей
             query = (
                 select(Habit, User)
                 .join(User)
@@ -385,47 +705,17 @@ class DatabaseService:
                     and_(
                         Habit.is_active == True,
                         Habit.is_paused == False,
-                        Habit.reminder_time.isnot(None),
-                        User.notification_enabled == True
+                        or_(
+                            Habit.last_completed_date.is_(None),
+                            Habit.last_completed_date != date.today()
+                        ),
+                        User.notification_enabled == True,
+                        or_(*slot_conditions)
                     )
                 )
-                .options(joinedload(Habit.user))
             )
             
-            # Добавляем фильтр по времени если окно не пересекает полночь
-            if time_window_start <= time_window_end:
-                query = query.where(
-                    and_(
-                        cast(Habit.reminder_time, Time) >= time_window_start,
-                        cast(Habit.reminder_time, Time) <= time_window_end
-                    )
-                )
-            # Если окно пересекает полночь (например, 23:55 - 00:05), используем OR
-            else:
-                query = query.where(
-                    or_(
-                        cast(Habit.reminder_time, Time) >= time_window_start,
-                        cast(Habit.reminder_time, Time) <= time_window_end
-                    )
-                )
-            
+            # User уже приходит вторым элементом кортежа - отдельный
+            # joinedload(Habit.user) лишь дублировал JOIN users
             result = await session.execute(query)
-            
-            habits_users = []
-            for habit, user in result.all():
-                if habit.reminder_time:
-                    # Конвертируем UTC время в локальное время пользователя
-                    try:
-                        user_tz = pytz.timezone(user.timezone)
-                    except pytz.UnknownTimeZoneError:
-                        user_tz = pytz.UTC
-                    
-                    # current_time приходит в UTC
-                    user_local_time = current_time.replace(tzinfo=pytz.UTC).astimezone(user_tz)
-                    current_time_str = user_local_time.strftime("%H:%M")
-                    habit_time = habit.reminder_time.strftime("%H:%M")
-                    
-                    if habit_time == current_time_str and habit.should_remind_today(user_local_time.date()):
-                        habits_users.append((habit, user))
-            
-            return habits_users
+            return [(habit, user) for habit, user in result.all()]
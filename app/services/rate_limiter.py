@@ -3,10 +3,14 @@ Rate limiting для AI-запросов и других операций.
 """
 
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 from dataclasses import dataclass, field
 
+from app.config import get_settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,14 +18,15 @@ logger = logging.getLogger(__name__)
 class RateLimitEntry:
     """Запись для отслеживания rate limit."""
     count: int = 0
-    window_start: datetime = field(default_factory=datetime.utcnow)
-    last_request: datetime = field(default_factory=datetime.utcnow)
+    # Моменты времени по time.monotonic() (секунды)
+    window_start: float = field(default_factory=time.monotonic)
+    last_request: float = field(default_factory=time.monotonic)
 
 
 class RateLimiter:
     """
     Rate limiter с поддержкой per-user и global limits.
-    In-memory реализация (для продакшена лучше Redis).
+    In-memory реализация (для нескольких процессов - RedisRateLimiter).
     """
     
     def __init__(
@@ -32,12 +37,13 @@ class RateLimiter:
         global_window: int = 60  # секунд
     ):
         self.user_limit = user_limit
-        self.user_window = timedelta(seconds=user_window)
+        self.user_window = float(user_window)
         self.global_limit = global_limit
-        self.global_window = timedelta(seconds=global_window)
+        self.global_window = float(global_window)
         
-        # Хранилище: user_id -> RateLimitEntry
-        self._user_limits: Dict[int, RateLimitEntry] = {}
+        # Хранилище: user_id -> RateLimitEntry, упорядочено по window_start
+        # (новое окно всегда уходит в конец), поэтому устаревшие записи - в начале
+        self._user_limits: "OrderedDict[int, RateLimitEntry]" = OrderedDict()
         
         # Глобальный счетчик
         self._global_limit = RateLimitEntry()
@@ -49,28 +55,27 @@ class RateLimiter:
     
     def _cleanup_old_entries(self):
         """Очистка устаревших записей."""
-        now = datetime.utcnow()
+        now = time.monotonic()
         
-        # Очистка пользователей
-        expired = [
-            user_id for user_id, entry in self._user_limits.items()
-            if now - entry.window_start > self.user_window
-        ]
-        for user_id in expired:
-            del self._user_limits[user_id]
+        # Очистка пользователей: снимаем с начала, пока окна истекли
+        while self._user_limits:
+            entry = next(iter(self._user_limits.values()))
+            if now - entry.window_start <= self.user_window:
+                break
+            self._user_limits.popitem(last=False)
         
         # Очистка глобального счетчика
         if now - self._global_limit.window_start > self.global_window:
             self._global_limit = RateLimitEntry()
     
-    def check_rate_limit(self, user_id: int) -> Tuple[bool, Optional[str]]:
+    async def check_rate_limit(self, user_id: int) -> Tuple[bool, Optional[str]]:
         """
         Проверка rate limit для пользователя.
         
         Returns:
             Tuple[allowed: bool, reason: Optional[str]]
         """
-        now = datetime.utcnow()
+        now = time.monotonic()
         self._cleanup_old_entries()
         
         # Проверка глобального лимита
@@ -91,17 +96,18 @@ class RateLimiter:
         if now - user_entry.window_start > self.user_window:
             user_entry = RateLimitEntry(window_start=now)
             self._user_limits[user_id] = user_entry
+            self._user_limits.move_to_end(user_id)
         
         if user_entry.count >= self.user_limit:
-            remaining = self.user_window - (now - user_entry.window_start)
+            remaining = int(self.user_window - (now - user_entry.window_start))
             logger.warning(f"User {user_id} rate limit exceeded: {user_entry.count}/{self.user_limit}")
-            return False, f"⏳ Слишком много запросов. Попробуйте через {remaining.seconds} секунд."
+            return False, f"⏳ Слишком много запросов. Попробуйте через {remaining} секунд."
         
         return True, None
     
-    def record_request(self, user_id: int):
+    async def record_request(self, user_id: int):
         """Запись успешного запроса."""
-        now = datetime.utcnow()
+        now = time.monotonic()
         
         # Обновляем глобальный счетчик
         self._global_limit.count += 1
@@ -118,7 +124,7 @@ class RateLimiter:
     
     def get_status(self, user_id: int) -> Dict:
         """Получение текущего статуса rate limit для пользователя."""
-        now = datetime.utcnow()
+        now = time.monotonic()
         
         if user_id not in self._user_limits:
             return {
@@ -141,17 +147,109 @@ class RateLimiter:
             "user_limit": self.user_limit,
             "user_used": user_used,
             "user_remaining": max(0, self.user_limit - user_used),
-            "user_reset_in": max(0, (self.user_window - (now - user_entry.window_start)).seconds),
+            "user_reset_in": max(0, int(self.user_window - (now - user_entry.window_start))),
             "global_limit": self.global_limit,
             "global_used": self._global_limit.count,
             "global_remaining": max(0, self.global_limit - self._global_limit.count)
         }
+    
+    async def close(self) -> None:
+        """Внешних ресурсов нет - метод для общего интерфейса с RedisRateLimiter."""
+
+
+class RedisRateLimiter:
+    """
+    Rate limiter на Redis: фиксированные окна через INCR + EXPIRE.
+    
+    Счетчики общие для всех процессов бота. Ключ содержит номер окна,
+    поэтому сброс не нужен - старые ключи просто истекают.
+    При недоступности Redis запросы пропускаются (fail-open).
+    """
+    
+    KEY_PREFIX = "rl"
+    
+    def __init__(
+        self,
+        redis_url: str,
+        user_limit: int = 10,
+        user_window: int = 60,
+        global_limit: int = 100,
+        global_window: int = 60
+    ):
+        from redis.asyncio import Redis
+        
+        self._redis = Redis.from_url(redis_url)
+        self.user_limit = user_limit
+        self.user_window = user_window
+        self.global_limit = global_limit
+        self.global_window = global_window
+        
+        logger.info(
+            f"RedisRateLimiter initialized: user_limit={user_limit}/{user_window}s, "
+            f"global_limit={global_limit}/{global_window}s"
+        )
+    
+    def _keys(self, user_id: int, now: float) -> Tuple[str, str]:
+        """Ключи счетчиков текущих окон (пользовательского и глобального)."""
+        return (
+            f"{self.KEY_PREFIX}:u:{user_id}:{int(now // self.user_window)}",
+            f"{self.KEY_PREFIX}:g:{int(now // self.global_window)}",
+        )
+    
+    async def check_rate_limit(self, user_id: int) -> Tuple[bool, Optional[str]]:
+        """
+        Проверка rate limit для пользователя (один запрос MGET).
+        
+        Returns:
+            Tuple[allowed: bool, reason: Optional[str]]
+        """
+        now = time.time()
+        user_key, global_key = self._keys(user_id, now)
+        
+        try:
+            user_count, global_count = await self._redis.mget(user_key, global_key)
+        except Exception as e:
+            logger.error(f"Redis rate limit check failed: {e}")
+            return True, None
+        
+        if int(global_count or 0) >= self.global_limit:
+            logger.warning(f"Global rate limit exceeded: {int(global_count)}/{self.global_limit}")
+            return False, "🌐 Слишком много запросов. Попробуйте позже."
+        
+        if int(user_count or 0) >= self.user_limit:
+            remaining = int(self.user_window - now % self.user_window)
+            logger.warning(f"User {user_id} rate limit exceeded: {int(user_count)}/{self.user_limit}")
+            return False, f"⏳ Слишком много запросов. Попробуйте через {remaining} секунд."
+        
+        return True, None
+    
+    async def record_request(self, user_id: int):
+        """Запись успешного запроса (INCR + EXPIRE в одном pipeline)."""
+        user_key, global_key = self._keys(user_id, time.time())
+        
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.incr(user_key).expire(user_key, self.user_window)
+                pipe.incr(global_key).expire(global_key, self.global_window)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis rate limit record failed: {e}")
+    
+    async def close(self) -> None:
+        """Закрытие пула соединений Redis."""
+        await self._redis.aclose()
 
 
-# Глобальный экземпляр rate limiter для AI
-ai_rate_limiter = RateLimiter(
-    user_limit=10,      # 10 запросов в минуту на пользователя
-    user_window=60,     # окно 60 секунд
-    global_limit=100,   # 100 запросов в минуту глобально
-    global_window=60
-)
+@lru_cache(maxsize=1)
+def get_ai_rate_limiter():
+    """Общий rate limiter для AI: Redis, если задан REDIS_URL, иначе in-memory."""
+    settings = get_settings()
+    limits = dict(
+        user_limit=10,      # 10 запросов в минуту на пользователя
+        user_window=60,     # окно 60 секунд
+        global_limit=100,   # 100 запросов в минуту глобально
+        global_window=60
+    )
+    if settings.redis_url:
+        return RedisRateLimiter(settings.redis_url, **limits)
+    return RateLimiter(**limits)
@@ -3,6 +3,7 @@
 Использует APScheduler для планирования задач.
 """
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
@@ -13,7 +14,8 @@ from aiogram.exceptions import TelegramForbiddenError, TelegramNotFound
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-from app.config import settings
+from app.keyboards import get_manual_reminder_keyboard, get_reminder_keyboard
+from app.models import Habit, User
 from app.services.database import DatabaseService
 from app.services.ai_service import AIService
 
@@ -23,6 +25,14 @@ logger = logging.getLogger(__name__)
 class ReminderService:
     """Сервис для отправки напоминаний о привычках."""
     
+    # Одновременных отправок в Telegram за один тик
+    SEND_CONCURRENCY = 25
+    
+    # Триггеры собираются один раз при импорте. Пояс задан явно: без него
+    # CronTrigger берет локальный пояс хоста, а не UTC планировщика
+    REMINDER_TRIGGER = CronTrigger(minute="*", timezone="UTC")
+    PATTERN_ANALYSIS_TRIGGER = CronTrigger(hour=3, minute=0, timezone="UTC")
+    
     def __init__(
         self,
         bot: Bot,
@@ -35,23 +45,37 @@ class ReminderService:
         self.scheduler: Optional[AsyncIOScheduler] = None
     
     async def start(self) -> None:
-        """Запуск планировщика напоминаний."""
+        """
+        Запуск планировщика напоминаний.
+        
+        Все задачи идут с max_instances=1 и coalesce=True: затянувшийся
+        запуск не накладывается на следующий, а пропущенные запуски
+        выполняются один раз (если не вышел misfire_grace_time).
+        """
         self.scheduler = AsyncIOScheduler(timezone="UTC")
         
         # Добавляем задачу на каждую минуту для проверки напоминаний
         self.scheduler.add_job(
             self._check_and_send_reminders,
-            trigger=CronTrigger(minute="*"),  # Каждую минуту
+            trigger=self.REMINDER_TRIGGER,  # Каждую минуту
             id="reminder_check",
-            replace_existing=True
+            replace_existing=True,
+            # Тик ищет привычки на текущую минуту, поэтому пропущенные
+            # запуски не догоняем, а схлопываем в один
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=30
         )
         
         # Добавляем задачу анализа паттернов раз в день
         self.scheduler.add_job(
             self._daily_pattern_analysis,
-            trigger=CronTrigger(hour=3, minute=0),  # В 3 ночи
+            trigger=self.PATTERN_ANALYSIS_TRIGGER,  # В 3 ночи (UTC)
             id="pattern_analysis",
-            replace_existing=True
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=3600
         )
         
         self.scheduler.start()
@@ -70,84 +94,65 @@ class ReminderService:
             
             # Получаем привычки для напоминания
             # Теперь передаем UTC время, а сравнение происходит с учетом часового пояса
-            habits_users = await self.db.get_habits_for_reminder(now)
+            # (уже выполненные сегодня привычки отфильтрованы в SQL)
+            pending = await self.db.get_habits_for_reminder(now)
+            
+            # AI-напоминания генерируем параллельно одной пачкой
+            ai_items = [(user, habit) for habit, user in pending if user.ai_enabled]
+            ai_messages = dict(zip(
+                (habit.id for _, habit in ai_items),
+                await self.ai.generate_reminders_bulk(ai_items)
+            ))
+            
+            semaphore = asyncio.Semaphore(self.SEND_CONCURRENCY)
+            
+            async def send_one(habit: Habit, user: User) -> None:
+                message = ai_messages.get(habit.id) or (
+                    f"{habit.emoji} <b>Напоминание!</b>\n\n"
+                    f"Пора выполнить привычку: <b>{habit.name}</b>\n"
+                    f"🔥 Текущая серия: {habit.current_streak} дней"
+                )
+                async with semaphore:
+                    await self._send_reminder(habit, user, message)
+            
+            # Отправляем параллельно, не больше SEND_CONCURRENCY одновременно
+            await asyncio.gather(*(send_one(habit, user) for habit, user in pending))
+            
+        except Exception as e:
+            logger.error(f"Error in reminder check: {e}")
+    
+    async def _send_reminder(self, habit: Habit, user: User, message: str) -> None:
+        """Отправка одного напоминания с обработкой ошибок Telegram."""
+        try:
+            keyboard = get_reminder_keyboard(habit.id)
             
-            for habit, user in habits_users:
-                # Проверяем, не выполнена ли уже привычка сегодня
-                if habit.is_completed_today:
-                    continue
+            await self.bot.send_message(
+                chat_id=user.id,
+                text=message,
+                reply_markup=keyboard,
+                parse_mode="HTML"
+            )
+            
+            logger.info(f"✅ Reminder sent to user {user.id} for habit {habit.id}")
+            
+        except TelegramForbiddenError:
+            # Пользователь заблокировал бота - отключаем уведомления
+            logger.warning(f"🚫 User {user.id} blocked the bot. Disabling notifications.")
+            try:
+                await self.db.update_user(user.id, notification_enabled=False)
+            except Exception as db_err:
+                logger.error(f"Failed to disable notifications for user {user.id}: {db_err}")
                 
-                # Проверяем, включены ли AI-напоминания
-                if user.ai_enabled:
-                    try:
-                        message = await self.ai.get_personalized_reminder(user, habit)
-                    except Exception as e:
-                        logger.error(f"AI reminder generation failed: {e}")
-                        message = (
-                            f"{habit.emoji} <b>Напоминание!</b>\n\n"
-                            f"Пора выполнить привычку: <b>{habit.name}</b>\n"
-                            f"🔥 Текущая серия: {habit.current_streak} дней"
-                        )
-                else:
-                    message = (
-                        f"{habit.emoji} <b>Напоминание!</b>\n\n"
-                        f"Пора выполнить привычку: <b>{habit.name}</b>\n"
-                        f"🔥 Текущая серия: {habit.current_streak} дней"
-                    )
+        except TelegramNotFound:
+            # Пользователь удалил чат
+            logger.warning(f"🚫 Chat not found for user {user.id}. Disabling notifications.")
+            try:
+                await self.db.update_user(user.id, notification_enabled=False)
+            except Exception as db_err:
+                logger.error(f"Failed to disable notifications for user {user.id}: {db_err}")
                 
-                # Отправляем напоминание
-                try:
-                    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-                    
-                    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                        [
-                            InlineKeyboardButton(
-                                text="✅ Выполнено",
-                                callback_data=f"complete:{habit.id}"
-                            ),
-                            InlineKeyboardButton(
-                                text="⏰ Напомнить через час",
-                                callback_data=f"snooze:{habit.id}"
-                            )
-                        ],
-                        [
-                            InlineKeyboardButton(
-                                text="❌ Пропустить",
-                                callback_data=f"skip:{habit.id}"
-                            )
-                        ]
-                    ])
-                    
-                    await self.bot.send_message(
-                        chat_id=user.id,
-                        text=message,
-                        reply_markup=keyboard,
-                        parse_mode="HTML"
-                    )
-                    
-                    logger.info(f"✅ Reminder sent to user {user.id} for habit {habit.id}")
-                    
-                except TelegramForbiddenError:
-                    # Пользователь заблокировал бота - отключаем уведомления
-                    logger.warning(f"🚫 User {user.id} blocked the bot. Disabling notifications.")
-                    try:
-                        await self.db.update_user(user.id, notification_enabled=False)
-                    except Exception as db_err:
-                        logger.error(f"Failed to disable notifications for user {user.id}: {db_err}")
-                        
-                except TelegramNotFound:
-                    # Пользователь удалил чат
-                    logger.warning(f"🚫 Chat not found for user {user.id}. Disabling notifications.")
-                    try:
-                        await self.db.update_user(user.id, notification_enabled=False)
-                    except Exception as db_err:
-                        logger.error(f"Failed to disable notifications for user {user.id}: {db_err}")
-                        
-                except Exception as e:
-                    logger.error(f"❌ Failed to send reminder to {user.id}: {e}", exc_info=True)
-                    
         except Exception as e:
-            logger.error(f"Error in reminder check: {e}")
+            logger.error(f"❌ Failed to send reminder to {user.id}: {e}", exc_info=True)
     
     async def _daily_pattern_analysis(self) -> None:
         """Ежедневный анализ паттернов пользователей."""
@@ -206,16 +211,7 @@ class ReminderService:
                     f"🔥 Текущая серия: {habit.current_streak} дней"
                 )
             
-            from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-            
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text="✅ Выполнено",
-                        callback_data=f"complete:{habit.id}"
-                    )
-                ]
-            ])
+            keyboard = get_manual_reminder_keyboard(habit.id)
             
             await self.bot.send_message(
                 chat_id=user_id,
@@ -36,74 +36,34 @@ class StreakService:
             return []
         
         habits = await self.db.get_user_habits(user_id, active_only=True)
-        broken_streaks = []
         
-        for habit in habits:
-            broken = await self._check_habit_streak(habit, user.streak_break_days)
-            if broken:
-                broken_streaks.append((habit, habit.current_streak))
-                logger.info(
-                    f"Streak broken for user {user_id}, habit {habit.id}: "
-                    f"was {habit.current_streak}, reset to 0"
-                )
-        
-        # Обновляем время последней проверки
-        await self.db.update_user(user_id, last_streak_check=datetime.utcnow())
-        
-        return broken_streaks
-    
-    async def _check_habit_streak(self, habit: Habit, break_days: int) -> bool:
-        """
-        Проверка одной привычки на необходимость сброса серии.
-        
-        Args:
-            habit: Привычка для проверки
-            break_days: Количество дней без выполнения для сброса
-        
-        Returns:
-            True если серия была сброшена
-        """
-        # Если серия уже 0 - нечего сбрасывать
-        if habit.current_streak == 0:
-            return False
-        
-        # Получаем последний лог привычки
-        logs = await self.db.get_habit_logs(habit.id, habit.user_id, days=break_days + 1)
-        
-        if not logs:
-            # Нет логов за последние N дней - сбрасываем серию
-            await self._break_streak(habit)
-            return True
-        
-        # Находим последнюю запись со статусом completed
-        last_completed = None
-        for log in sorted(logs, key=lambda x: x.completed_date, reverse=True):
-            if log.status == "completed":
-                last_completed = log.completed_date
-                break
+        # Серию сбрасываем, если последнее выполнение было streak_break_days
+        # дней назад или раньше (или его нет вовсе)
+        cutoff = date.today() - timedelta(days=user.streak_break_days - 1)
+        candidates = [habit for habit in habits if habit.current_streak > 0]
+        last_completed = await self.db.get_last_completion_dates(
+            user_id, [habit.id for habit in candidates], since=cutoff
+        )
         
-        if not last_completed:
-            # Нет выполнений вообще - сбрасываем
-            await self._break_streak(habit)
-            return True
+        broken_streaks = [
+            (habit, habit.current_streak) for habit in candidates
+            if habit.id not in last_completed
+        ]
         
-        # Вычисляем сколько дней прошло
-        days_since_completion = (date.today() - last_completed).days
+        # Сброс серий и время последней проверки - одним коммитом
+        await self.db.apply_streak_check(
+            user_id,
+            [habit.id for habit, _ in broken_streaks],
+            checked_at=datetime.utcnow()
+        )
         
-        if days_since_completion >= break_days:
-            # Прошло достаточно дней - сбрасываем серию
-            await self._break_streak(habit)
-            return True
+        for habit, old_streak in broken_streaks:
+            logger.info(
+                f"Streak broken for user {user_id}, habit {habit.id}: "
+                f"was {old_streak}, reset to 0"
+            )
         
-        return False
-    
-    async def _break_streak(self, habit: Habit) -> None:
-        """Сброс серии привычки."""
-        await self.db.update_habit(
-            habit.id,
-            habit.user_id,
-            current_streak=0
-        )
+        return broken_streaks
     
     async def notify_broken_streaks(
         self, 
@@ -115,7 +75,7 @@ class StreakService:
         if not broken:
             return
         
-        from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+        from app.keyboards import get_broken_streaks_keyboard
         
         # Формируем сообщение
         if len(broken) == 1:
@@ -127,26 +87,18 @@ class StreakService:
                 f"Не расстраивайся! Начни новую серию прямо сейчас 💪"
             )
         else:
+            lines = "".join(
+                f"• {habit.emoji} {habit.name}: {old_streak} дней\n"
+                for habit, old_streak in broken
+            )
             text = (
                 f"😔 <b>Несколько серий прервано</b>\n\n"
                 f"Сброшены серии:\n"
+                f"{lines}"
+                f"\nНе сдавайся! Начни заново 💪"
             )
-            for habit, old_streak in broken:
-                text += f"• {habit.emoji} {habit.name}: {old_streak} дней\n"
-            text += "\nНе сдавайся! Начни заново 💪"
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="📋 Мои привычки",
-                    callback_data="list_habits"
-                ),
-                InlineKeyboardButton(
-                    text="🤖 AI-совет",
-                    callback_data="ai_advice"
-                )
-            ]
-        ])
+        keyboard = get_broken_streaks_keyboard()
         
         try:
             await bot.send_message(
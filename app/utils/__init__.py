@@ -1,5 +1,6 @@
 """Utils package."""
 
+from .cache import TTLCache
 from .decorators import admin_required, log_execution_time, retry_on_error
 from .logger import setup_logging
 
@@ -8,4 +9,5 @@ __all__ = [
     "log_execution_time",
     "retry_on_error",
     "setup_logging",
+    "TTLCache",
 ]
@@ -2,13 +2,16 @@
 Декораторы для хендлеров.
 """
 
+import asyncio
 import functools
 import logging
+import random
+import time
 from typing import Callable
 
 from aiogram.types import Message, CallbackQuery
 
-from app.config import settings
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +43,7 @@ def admin_required(handler: Callable) -> Callable:
             return None
         
         # Проверяем, есть ли пользователь в списке админов
-        if user_id not in settings.admin_ids:
+        if user_id not in get_settings().admin_ids:
             logger.warning(f"Access denied for user {user_id}")
             
             # Отправляем сообщение об отказе
@@ -70,14 +73,13 @@ def log_execution_time(handler: Callable) -> Callable:
     """
     @functools.wraps(handler)
     async def wrapper(*args, **kwargs):
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             result = await handler(*args, **kwargs)
             return result
         finally:
-            execution_time = (time.time() - start_time) * 1000
+            execution_time = (time.perf_counter() - start_time) * 1000
             logger.debug(
                 f"Handler {handler.__name__} executed in {execution_time:.2f}ms"
             )
@@ -85,13 +87,26 @@ def log_execution_time(handler: Callable) -> Callable:
     return wrapper
 
 
-def retry_on_error(max_retries: int = 3, exceptions: tuple = (Exception,)):
+def retry_on_error(
+    max_retries: int = 3,
+    exceptions: tuple = (Exception,),
+    non_retryable: tuple = (),
+    backoff_base: float = 0.5,
+    backoff_max: float = 30.0
+):
     """
     Декоратор для повторных попыток при ошибках.
     
+    Задержка между попытками - экспоненциальная с полным jitter, чтобы
+    одновременные повторы не били в сервис одной волной.
+    
     Args:
         max_retries: Максимальное количество попыток
         exceptions: Кортеж исключений для перехвата
+        non_retryable: Исключения, которые пробрасываются сразу (повтор
+            заведомо не поможет, например TelegramBadRequest)
+        backoff_base: Базовая задержка в секундах
+        backoff_max: Верхняя граница задержки в секундах
     
     Usage:
         @retry_on_error(max_retries=3, exceptions=(NetworkError,))
@@ -106,6 +121,8 @@ def retry_on_error(max_retries: int = 3, exceptions: tuple = (Exception,)):
             for attempt in range(1, max_retries + 1):
                 try:
                     return await handler(*args, **kwargs)
+                except non_retryable:
+                    raise
                 except exceptions as e:
                     last_exception = e
                     logger.warning(
@@ -113,8 +130,8 @@ def retry_on_error(max_retries: int = 3, exceptions: tuple = (Exception,)):
                     )
                     
                     if attempt < max_retries:
-                        import asyncio
-                        await asyncio.sleep(0.5 * attempt)  # Экспоненциальная задержка
+                        delay = min(backoff_max, backoff_base * 2 ** (attempt - 1))
+                        await asyncio.sleep(random.uniform(0, delay))
             
             # Все попытки исчерпаны
             logger.error(
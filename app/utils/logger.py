@@ -2,33 +2,57 @@
 Настройка логирования.
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 
-from app.config import settings
+from app.config import get_settings
+
+# Внешние библиотеки, шум от которых приглушаем
+_QUIET_LOGGERS = ("aiogram", "apscheduler", "sqlalchemy", "aiohttp.access")
 
 
 def setup_logging() -> None:
     """Настройка формата и уровня логирования."""
     
+    level = getattr(logging, get_settings().log_level.upper(), logging.INFO)
+    
     # Формат логов
     log_format = "%(asctime)s | %(name)s | %(levelname)s | %(message)s"
     date_format = "%Y-%m-%d %H:%M:%S"
     
+    # Формат не использует потоки/процессы - не собираем их для каждой записи
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
+    # Вывод в stdout делает отдельный поток: в event loop запись лога -
+    # только постановка в очередь
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(log_format, datefmt=date_format))
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # Окончательное форматирование - в stream_handler
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
     # Настройка базового логирования
     logging.basicConfig(
-        level=getattr(logging, settings.log_level.upper()),
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
+        level=level,
+        handlers=[queue_handler]
     )
     
     # Уменьшаем шум от внешних библиотек
-    logging.getLogger("aiogram").setLevel(logging.WARNING)
-    logging.getLogger("apscheduler").setLevel(logging.WARNING)
-    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+    for name in _QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
     
     # Наши модули логируем подробнее
-    logging.getLogger("app").setLevel(getattr(logging, settings.log_level.upper()))
+    logging.getLogger("app").setLevel(level)
@@ -6,25 +6,62 @@ HabitMax Telegram Bot
 """
 
 import asyncio
+import gc
 import logging
 
+import orjson
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 
-from app.config import settings
+from app.config import get_settings
 from app.handlers import common_router, habits_router, ai_router, admin_router
 from app.middlewares import ServicesMiddleware
 from app.middlewares.fsm_timeout import FSMTimeoutMiddleware
-from app.services import DatabaseService, AIService, ReminderService
+from app.services import DatabaseService, AIService, ReminderService, StreakService
+from app.services.rate_limiter import get_ai_rate_limiter
 from app.utils import setup_logging
 
 logger = logging.getLogger(__name__)
 
+# Порог сборки поколения 0: на каждый апдейт создается много короткоживущих
+# объектов, при дефолтном пороге GC запускается слишком часто
+GC_THRESHOLD = (50_000, 10, 10)
+
+# Long polling: Telegram держит запрос открытым до прихода апдейта
+POLLING_TIMEOUT = 50
+
+# Сколько хранить состояние FSM в Redis (брошенные диалоги не копятся).
+# FSMTimeoutMiddleware и так сбрасывает диалог через 10 минут простоя
+FSM_REDIS_TTL = 3600
+FSM_REDIS_MAX_CONNECTIONS = 20
+
+
+def _create_fsm_storage() -> BaseStorage:
+    """Хранилище FSM: Redis, если задан REDIS_URL, иначе память процесса."""
+    settings = get_settings()
+    if settings.redis_url:
+        from aiogram.fsm.storage.redis import RedisStorage
+        
+        logger.info("Using Redis FSM storage")
+        return RedisStorage.from_url(
+            settings.redis_url,
+            connection_kwargs={"max_connections": FSM_REDIS_MAX_CONNECTIONS},
+            state_ttl=FSM_REDIS_TTL,
+            data_ttl=FSM_REDIS_TTL,
+            json_loads=orjson.loads,
+            json_dumps=orjson.dumps
+        )
+    return MemoryStorage()
+
 
 async def main() -> None:
     """Главная функция запуска бота."""
     
+    settings = get_settings()
+    
     # Настройка логирования
     setup_logging()
     logger.info("Starting HabitMax Telegram Bot...")
@@ -55,70 +92,103 @@ async def main() -> None:
     logger.info("Database initialized")
     
     # Создание бота и диспетчера
-    bot = Bot(token=settings.bot_token)
-    storage = MemoryStorage()
+    # Одна HTTP-сессия на все запросы бота (в т.ч. параллельные напоминания);
+    # клавиатуры и ответы Telegram (де)сериализуются через orjson
+    bot_session = AiohttpSession(
+        json_loads=orjson.loads,
+        json_dumps=lambda value: orjson.dumps(value).decode()
+    )
+    bot = Bot(token=settings.bot_token, session=bot_session)
+    storage = _create_fsm_storage()
     dp = Dispatcher(storage=storage)
     
-    # Инициализация AI-сервиса
-    ai_service = AIService(db_service)
-    logger.info(f"AI Service initialized with model: {settings.openrouter_model}")
+    # Инициализация AI-сервиса (HTTP-сессия живёт, пока открыт контекст)
+    async with AIService(db_service) as ai_service:
+        logger.info(f"AI Service initialized with model: {settings.openrouter_model}")
     
-    # Инициализация сервиса напоминаний
-    reminder_service = ReminderService(bot, db_service, ai_service)
-    await reminder_service.start()
-    logger.info("Reminder service started")
+        # Инициализация сервиса напоминаний
+        reminder_service = ReminderService(bot, db_service, ai_service)
+        await reminder_service.start()
+        logger.info("Reminder service started")
     
-    # Регистрация middleware
-    # FSM таймаут (должен быть первым для проверки истечения)
-    dp.message.middleware(FSMTimeoutMiddleware(timeout_minutes=10))
-    dp.callback_query.middleware(FSMTimeoutMiddleware(timeout_minutes=10))
+        # Регистрация middleware
+        # FSM таймаут (должен быть первым для проверки истечения)
+        dp.message.middleware(FSMTimeoutMiddleware(timeout_minutes=10))
+        dp.callback_query.middleware(FSMTimeoutMiddleware(timeout_minutes=10))
     
-    # DI сервисы
-    dp.message.middleware(
-        ServicesMiddleware(db_service, ai_service, reminder_service)
-    )
-    dp.callback_query.middleware(
-        ServicesMiddleware(db_service, ai_service, reminder_service)
-    )
-    logger.info("Middleware registered")
+        # DI сервисы (один экземпляр - общий кэш проверок streaks)
+        services_middleware = ServicesMiddleware(
+            db_service, ai_service, reminder_service, StreakService(db_service)
+        )
+        dp.message.middleware(services_middleware)
+        dp.callback_query.middleware(services_middleware)
+        logger.info("Middleware registered")
     
-    # Регистрация роутеров
-    dp.include_router(common_router)
-    dp.include_router(habits_router)
-    dp.include_router(ai_router)
-    dp.include_router(admin_router)
-    logger.info("Routers registered")
+        # Регистрация роутеров
+        dp.include_router(common_router)
+        dp.include_router(habits_router)
+        dp.include_router(ai_router)
+        dp.include_router(admin_router)
+        logger.info("Routers registered")
+        
+        # Дерево роутеров дальше не меняется - типы апдейтов считаем один раз
+        allowed_updates = dp.resolve_used_update_types()
+        logger.info(f"Allowed updates: {allowed_updates}")
     
-    # Установка команд бота
-    await bot.set_my_commands([
-        BotCommand(command="start", description="Zapustit bota / Glavnoe menu"),
-        BotCommand(command="add_habit", description="Dobavit novuyu privychku"),
-        BotCommand(command="my_habits", description="Spisok moih privychek"),
-        BotCommand(command="my_progress", description="Moi progress i statistika"),
-        BotCommand(command="ai_advice", description="Poluchit AI-rekomendaciyu"),
-        BotCommand(command="analyze_patterns", description="Analizirovat moi patterny"),
-        BotCommand(command="settings", description="Nastroiki bota"),
-        BotCommand(command="help", description="Pomosh i instrukciya"),
-    ])
-    logger.info("Bot commands set")
+        # Установка команд бота
+        await bot.set_my_commands([
+            BotCommand(command="start", description="Zapustit bota / Glavnoe menu"),
+            BotCommand(command="add_habit", description="Dobavit novuyu privychku"),
+            BotCommand(command="my_habits", description="Spisok moih privychek"),
+            BotCommand(command="my_progress", description="Moi progress i statistika"),
+            BotCommand(command="ai_advice", description="Poluchit AI-rekomendaciyu"),
+            BotCommand(command="analyze_patterns", description="Analizirovat moi patterny"),
+            BotCommand(command="settings", description="Nastroiki bota"),
+            BotCommand(command="help", description="Pomosh i instrukciya"),
+        ])
+        logger.info("Bot commands set")
     
-    # Запуск поллинга
-    logger.info("Bot is running!")
+        # Всё созданное при старте (роутеры, сервисы, кэши) живет до конца
+        # работы - убираем его из сканирования сборщиком мусора
+        gc.collect()
+        gc.freeze()
+        gc.set_threshold(*GC_THRESHOLD)
+        
+        # Запуск поллинга
+        logger.info("Bot is running!")
+        try:
+            # Запрашиваем только те типы апдейтов, на которые есть хендлеры;
+            # каждый апдейт обрабатывается отдельной задачей
+            await dp.start_polling(
+                bot,
+                allowed_updates=allowed_updates,
+                polling_timeout=POLLING_TIMEOUT,
+                handle_as_tasks=True
+            )
+        finally:
+            # Graceful shutdown
+            logger.info("Shutting down...")
+            await reminder_service.stop()
+            await db_service.close()
+            await storage.close()
+            await get_ai_rate_limiter().close()
+            await bot.session.close()
+            logger.info("Bot stopped gracefully")
+
+
+def run(coro) -> None:
+    """Запуск event loop: uvloop, если установлен (нет на Windows), иначе asyncio."""
     try:
-        await dp.start_polling(bot)
-    finally:
-        # Graceful shutdown
-        logger.info("Shutting down...")
-        await reminder_service.stop()
-        await ai_service.close()
-        await db_service.close()
-        await bot.session.close()
-        logger.info("Bot stopped gracefully")
+        import uvloop
+    except ImportError:
+        asyncio.run(coro)
+    else:
+        uvloop.run(coro)
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         print("\nBot stopped by user")
     except Exception as e:
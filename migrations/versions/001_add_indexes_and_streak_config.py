@@ -32,29 +32,33 @@ def upgrade() -> None:
     op.add_column('habits', sa.Column('is_paused', sa.Boolean(), 
                                       nullable=False, server_default='0'))
     
-    # Индекс для reminder_time (partial index только для не-null значений)
-    op.create_index('idx_habits_reminder_time', 'habits', ['reminder_time'], 
-                    unique=False, postgresql_where=sa.text('reminder_time IS NOT NULL'))
-    
-    # Составной индекс для активных привычек пользователя
-    op.create_index('idx_habits_user_active', 'habits', ['user_id', 'is_active'], 
-                    unique=False)
-    
-    # Индекс для paused привычек
-    op.create_index('idx_habits_paused', 'habits', ['is_paused'], 
-                    unique=False)
-    
-    # Индекс для логов по пользователю и дате
-    op.create_index('idx_logs_user_date', 'habit_logs', ['user_id', 'completed_date'], 
-                    unique=False)
-    
-    # Индекс для логов по привычке
-    op.create_index('idx_logs_habit', 'habit_logs', ['habit_id', 'completed_date'], 
-                    unique=False)
-    
-    # Индекс для users по notification_enabled (для быстрой выборки)
-    op.create_index('idx_users_notifications', 'users', ['notification_enabled'], 
-                    unique=False)
+    # Индексы строим вне транзакции: на PostgreSQL - CONCURRENTLY,
+    # чтобы не блокировать запись в таблицы на время построения
+    with op.get_context().autocommit_block():
+        # Индекс для reminder_time (partial index только для не-null значений)
+        op.create_index('idx_habits_reminder_time', 'habits', ['reminder_time'], 
+                        unique=False, if_not_exists=True, postgresql_concurrently=True,
+                        postgresql_where=sa.text('reminder_time IS NOT NULL'))
+        
+        # Составной индекс для активных привычек пользователя
+        op.create_index('idx_habits_user_active', 'habits', ['user_id', 'is_active'], 
+                        unique=False, if_not_exists=True, postgresql_concurrently=True)
+        
+        # Индекс для paused привычек
+        op.create_index('idx_habits_paused', 'habits', ['is_paused'], 
+                        unique=False, if_not_exists=True, postgresql_concurrently=True)
+        
+        # Индекс для логов по пользователю и дате
+        op.create_index('idx_logs_user_date', 'habit_logs', ['user_id', 'completed_date'], 
+                        unique=False, if_not_exists=True, postgresql_concurrently=True)
+        
+        # Индекс для логов по привычке
+        op.create_index('idx_logs_habit', 'habit_logs', ['habit_id', 'completed_date'], 
+                        unique=False, if_not_exists=True, postgresql_concurrently=True)
+        
+        # Индекс для users по notification_enabled (для быстрой выборки)
+        op.create_index('idx_users_notifications', 'users', ['notification_enabled'], 
+                        unique=False, if_not_exists=True, postgresql_concurrently=True)
 
 
 def downgrade() -> None:
@@ -0,0 +1,38 @@
+"""Add habits.last_completed_date
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Денормализованная дата последнего выполнения (для is_completed_today)
+    op.add_column('habits', sa.Column('last_completed_date', sa.Date(),
+                                      nullable=True))
+    
+    # Заполняем по существующим логам
+    op.execute(
+        "UPDATE habits SET last_completed_date = ("
+        "SELECT MAX(habit_logs.completed_date) FROM habit_logs "
+        "WHERE habit_logs.habit_id = habits.id "
+        "AND habit_logs.status = 'completed')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('habits', 'last_completed_date')
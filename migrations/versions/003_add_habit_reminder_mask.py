@@ -0,0 +1,55 @@
+"""Add habits.reminder_mask
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Битовая маска дней напоминаний (бит 0 = понедельник)
+    op.add_column('habits', sa.Column('reminder_mask', sa.SmallInteger(),
+                                      nullable=False, server_default='127'))
+    
+    # Заполняем по частоте существующих привычек
+    op.execute(
+        "UPDATE habits SET reminder_mask = CASE frequency "
+        "WHEN 'weekdays' THEN 31 "
+        "WHEN 'weekends' THEN 96 "
+        "WHEN 'weekly' THEN 1 "
+        "ELSE 127 END"
+    )
+    
+    # custom_days - маска строкой, разбираем в Python (там может быть мусор)
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, custom_days FROM habits "
+        "WHERE frequency = 'custom' AND custom_days IS NOT NULL"
+    )).fetchall()
+    for habit_id, custom_days in rows:
+        try:
+            mask = int(custom_days) & 0x7F
+        except ValueError:
+            continue
+        conn.execute(
+            sa.text("UPDATE habits SET reminder_mask = :mask WHERE id = :id"),
+            {"mask": mask, "id": habit_id}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('habits', 'reminder_mask')
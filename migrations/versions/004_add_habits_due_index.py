@@ -0,0 +1,29 @@
+"""Add index for due reminder lookup
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Составной индекс для выборки напоминаний на текущую минуту
+    op.create_index('idx_habits_due', 'habits',
+                    ['is_active', 'is_paused', 'reminder_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_habits_due', table_name='habits')
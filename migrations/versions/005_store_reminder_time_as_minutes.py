@@ -0,0 +1,80 @@
+"""Store habit reminder time as minutes from midnight
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('idx_habits_due', table_name='habits')
+    op.drop_index('idx_habits_reminder_time', table_name='habits')
+    
+    # Время напоминания: минуты от полуночи (0..1439)
+    op.add_column('habits', sa.Column('reminder_minute', sa.SmallInteger(),
+                                      nullable=True))
+    
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE habits SET reminder_minute = "
+            "EXTRACT(HOUR FROM reminder_time) * 60 + EXTRACT(MINUTE FROM reminder_time) "
+            "WHERE reminder_time IS NOT NULL"
+        )
+    else:
+        # SQLite хранит TIME строкой 'HH:MM:SS.ffffff'
+        op.execute(
+            "UPDATE habits SET reminder_minute = "
+            "CAST(substr(reminder_time, 1, 2) AS INTEGER) * 60 + "
+            "CAST(substr(reminder_time, 4, 2) AS INTEGER) "
+            "WHERE reminder_time IS NOT NULL"
+        )
+    
+    with op.batch_alter_table('habits') as batch_op:
+        batch_op.drop_column('reminder_time')
+    
+    op.create_index('idx_habits_reminder_minute', 'habits', ['reminder_minute'],
+                    unique=False, postgresql_where=sa.text('reminder_minute IS NOT NULL'))
+    op.create_index('idx_habits_due', 'habits',
+                    ['is_active', 'is_paused', 'reminder_minute'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_habits_due', table_name='habits')
+    op.drop_index('idx_habits_reminder_minute', table_name='habits')
+    
+    op.add_column('habits', sa.Column('reminder_time', sa.Time(), nullable=True))
+    
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "UPDATE habits SET reminder_time = "
+            "make_time(reminder_minute / 60, reminder_minute % 60, 0) "
+            "WHERE reminder_minute IS NOT NULL"
+        )
+    else:
+        op.execute(
+            "UPDATE habits SET reminder_time = "
+            "printf('%02d:%02d:00.000000', reminder_minute / 60, reminder_minute % 60) "
+            "WHERE reminder_minute IS NOT NULL"
+        )
+    
+    with op.batch_alter_table('habits') as batch_op:
+        batch_op.drop_column('reminder_minute')
+    
+    op.create_index('idx_habits_reminder_time', 'habits', ['reminder_time'],
+                    unique=False, postgresql_where=sa.text('reminder_time IS NOT NULL'))
+    op.create_index('idx_habits_due', 'habits',
+                    ['is_active', 'is_paused', 'reminder_time'], unique=False)
@@ -0,0 +1,44 @@
+"""Drop indexes duplicated by primary keys and composite indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Индексы, которые create_all строил из index=True (имя, таблица, колонка).
+# Первичные ключи индексируются сами, а user_id / habit_id покрыты ведущей
+# колонкой idx_habits_user_active, idx_logs_user_date и idx_logs_habit.
+REDUNDANT_INDEXES = (
+    ('ix_users_id', 'users', 'id'),
+    ('ix_habits_id', 'habits', 'id'),
+    ('ix_habits_user_id', 'habits', 'user_id'),
+    ('ix_habit_logs_id', 'habit_logs', 'id'),
+    ('ix_habit_logs_user_id', 'habit_logs', 'user_id'),
+    ('ix_habit_logs_habit_id', 'habit_logs', 'habit_id'),
+    ('ix_ai_contexts_id', 'ai_contexts', 'id'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Базы, созданные миграциями, этих индексов могут не иметь
+    for name, _table, _column in REDUNDANT_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, column in REDUNDANT_INDEXES:
+        op.create_index(name, table, [column], unique=False)
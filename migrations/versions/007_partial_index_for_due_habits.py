@@ -0,0 +1,39 @@
+"""Replace reminder indexes with a partial index on active habits
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('idx_habits_due', table_name='habits')
+    op.drop_index('idx_habits_reminder_minute', table_name='habits')
+    
+    # В индекс попадают только активные и не приостановленные привычки
+    op.create_index('idx_habits_due', 'habits', ['reminder_minute'], unique=False,
+                    postgresql_where=sa.text('is_active AND NOT is_paused'),
+                    sqlite_where=sa.text('is_active = 1 AND is_paused = 0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_habits_due', table_name='habits')
+    
+    op.create_index('idx_habits_reminder_minute', 'habits', ['reminder_minute'],
+                    unique=False, postgresql_where=sa.text('reminder_minute IS NOT NULL'))
+    op.create_index('idx_habits_due', 'habits',
+                    ['is_active', 'is_paused', 'reminder_minute'], unique=False)
@@ -0,0 +1,48 @@
+"""Store habits.frequency as a native enum
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+habit_frequency = sa.Enum('daily', 'weekdays', 'weekends', 'weekly', 'custom',
+                          name='habit_frequency')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Нативные ENUM есть только в PostgreSQL; в SQLite колонка остается строкой
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    habit_frequency.create(op.get_bind(), checkfirst=True)
+    op.execute("ALTER TABLE habits ALTER COLUMN frequency DROP DEFAULT")
+    op.execute(
+        "ALTER TABLE habits ALTER COLUMN frequency TYPE habit_frequency "
+        "USING frequency::habit_frequency"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.execute(
+        "ALTER TABLE habits ALTER COLUMN frequency TYPE VARCHAR(20) "
+        "USING frequency::text"
+    )
+    habit_frequency.drop(op.get_bind(), checkfirst=True)
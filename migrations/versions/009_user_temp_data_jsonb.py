@@ -0,0 +1,40 @@
+"""Store users.temp_data as JSON
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 15:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # В SQLite JSON хранится текстом - менять нечего
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.execute(
+        "ALTER TABLE users ALTER COLUMN temp_data TYPE JSONB "
+        "USING NULLIF(temp_data, '')::jsonb"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.execute(
+        "ALTER TABLE users ALTER COLUMN temp_data TYPE VARCHAR(1000) "
+        "USING temp_data::text"
+    )
@@ -0,0 +1,44 @@
+"""Add INCLUDE columns to habit_logs indexes
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite не поддерживает INCLUDE - индексы остаются прежними
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.drop_index('idx_logs_user_date', table_name='habit_logs')
+    op.drop_index('idx_logs_habit', table_name='habit_logs')
+    
+    op.create_index('idx_logs_user_date', 'habit_logs', ['user_id', 'completed_date'],
+                    unique=False, postgresql_include=['habit_id', 'status'])
+    op.create_index('idx_logs_habit', 'habit_logs', ['habit_id', 'completed_date'],
+                    unique=False, postgresql_include=['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.drop_index('idx_logs_user_date', table_name='habit_logs')
+    op.drop_index('idx_logs_habit', table_name='habit_logs')
+    
+    op.create_index('idx_logs_user_date', 'habit_logs', ['user_id', 'completed_date'], unique=False)
+    op.create_index('idx_logs_habit', 'habit_logs', ['habit_id', 'completed_date'], unique=False)
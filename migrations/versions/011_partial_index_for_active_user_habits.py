@@ -0,0 +1,34 @@
+"""Add a partial index for the active habits of a user
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # get_user_habits(active_only=True): WHERE user_id = ? AND is_active
+    # ORDER BY created_at DESC - читается из индекса уже в нужном порядке
+    with op.get_context().autocommit_block():
+        op.create_index('idx_habits_user_live', 'habits', ['user_id', 'created_at'],
+                        unique=False, if_not_exists=True, postgresql_concurrently=True,
+                        postgresql_where=sa.text('is_active'),
+                        sqlite_where=sa.text('is_active = 1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_habits_user_live', table_name='habits')
@@ -0,0 +1,42 @@
+"""Index habit_logs.completed_date with BRIN on PostgreSQL
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-16 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # В SQLite нет BRIN - там остается btree по completed_date
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    # BRIN заменяет btree по completed_date (его строил create_all из index=True)
+    with op.get_context().autocommit_block():
+        op.create_index('idx_logs_date_brin', 'habit_logs', ['completed_date'],
+                        unique=False, if_not_exists=True, postgresql_concurrently=True,
+                        postgresql_using='brin', postgresql_with={'pages_per_range': 32})
+        op.drop_index('ix_habit_logs_completed_date', table_name='habit_logs',
+                      if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.create_index('ix_habit_logs_completed_date', 'habit_logs', ['completed_date'],
+                    unique=False, if_not_exists=True)
+    op.drop_index('idx_logs_date_brin', table_name='habit_logs')
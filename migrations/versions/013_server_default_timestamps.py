@@ -0,0 +1,55 @@
+"""Add server-side now() defaults to timestamp columns
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Колонки, которые create_all создавал без DEFAULT (было default=datetime.utcnow)
+TIMESTAMP_COLUMNS = {
+    'users': ['last_active'],
+    'habits': ['created_at'],
+    'habit_logs': ['completed_at'],
+    'ai_contexts': ['context_updated_at'],
+    # Таблицы Mini App создает api/main.py - их может не быть
+    'user_activities': ['session_start'],
+    'weekly_summaries': ['generated_at'],
+    'failure_analyses': ['generated_at'],
+    'ai_request_cache': ['created_at'],
+    'habit_insights': ['created_at'],
+}
+
+
+def _set_server_default(server_default) -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        if table not in tables:
+            continue
+        # SQLite не умеет ALTER COLUMN ... SET DEFAULT - batch пересоздает таблицу
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.DateTime(),
+                                      server_default=server_default)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _set_server_default(sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_server_default(None)